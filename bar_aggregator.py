@@ -0,0 +1,293 @@
+# Incremental OHLCV bars from live ticks
+# Each tick updates the in-progress bar of every configured interval in O(1);
+# finished bars are appended to typed buffers and exposed in the same frame
+# layout process_goldm_data produces, so analysis can run without re-fetching.
+#
+# Replay a tick file:  python bar_aggregator.py ticks.csv --intervals 1m,5m,1H
+
+import argparse
+import csv
+import json
+import time
+from array import array
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from resample import MCX_SESSION_START, BarAligner
+from structured_logging import get_logger, setup_logging
+
+
+logger = get_logger("bar_aggregator")
+
+EPOCH = datetime(1970, 1, 1)
+# Bars are kept in naive exchange-local time; aware timestamps are converted to it first
+EXCHANGE_TZ = ZoneInfo("Asia/Kolkata")
+BAR_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Accepted field names in tick dicts and replay files
+TICK_FIELDS = {
+    'timestamp': ('timestamp', 'datetime', 'dateTime', 'time', 'ts'),
+    'price': ('price', 'ltp', 'last', 'lastPrice', 'close'),
+    'volume': ('volume', 'vol', 'qty', 'quantity', 'lastQty')
+}
+
+
+def to_ns(value):
+    """
+    Convert a tick timestamp (ISO string, datetime, pd.Timestamp or epoch
+    seconds/milliseconds/nanoseconds) to int64 nanoseconds of naive local time
+    Timezone-aware values are converted to exchange time (Asia/Kolkata) first.
+    """
+    if isinstance(value, pd.Timestamp):
+        return (value.tz_convert(EXCHANGE_TZ).tz_localize(None) if value.tzinfo else value).value
+    if isinstance(value, np.datetime64):
+        return int(value.astype('M8[ns]').view(np.int64))
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            value = float(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(EXCHANGE_TZ).replace(tzinfo=None)
+        delta = value - EPOCH
+        return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
+    value = float(value) if not isinstance(value, int) else value
+    if abs(value) >= 1e17:    # nanoseconds
+        return int(value)
+    if abs(value) >= 1e11:    # milliseconds
+        return int(value * 1_000_000)
+    return int(value * 1_000_000_000)
+
+
+def _tick_field(tick, name):
+    for field in TICK_FIELDS[name]:
+        value = tick.get(field)
+        if value is not None:
+            return value
+    return None
+
+
+class _BarBuffer:
+    """
+    Finished bars of one interval as growable typed columns
+    """
+
+    def __init__(self):
+        self.start = array('q')
+        self.columns = {name: array('d') for name in BAR_COLUMNS}
+
+    def __len__(self):
+        return len(self.start)
+
+    def append(self, bar):
+        self.start.append(bar[0])
+        for name, value in zip(BAR_COLUMNS, bar[1:]):
+            self.columns[name].append(value)
+
+
+class BarAggregator:
+    """
+    Keeps in-progress and finished OHLCV bars for several intervals from a tick stream
+
+    Bars are labelled by their start time and aligned exactly like resample_ohlcv
+    (intraday bars from the MCX session open, daily bars by date, weekly by Monday),
+    so a live frame lines up with one built from historical data. Intervals with no
+    ticks produce no bar. Lateness is decided once per tick on the finest interval: a
+    tick whose bar there has already been closed (by a newer tick or by advance()) is
+    counted in late_ticks and ignored for every interval, so all intervals always
+    agree on which ticks they contain.
+
+    on_bar, if given, is called as on_bar(interval, bar_dict) for every finished bar.
+    Set cumulative_volume=True when the feed reports the day's running volume instead
+    of per-trade quantity; the first report then only sets the baseline.
+    """
+
+    def __init__(self, intervals=("1m", "5m", "1H"), session_start=MCX_SESSION_START,
+                 on_bar=None, cumulative_volume=False):
+        self.intervals = tuple(intervals)
+        self.on_bar = on_bar
+        self.cumulative_volume = cumulative_volume
+        self._aligners = [BarAligner(interval, session_start) for interval in self.intervals]
+        self._finest = min(range(len(self._aligners)), key=lambda i: self._aligners[i].step)
+        self._current = [None] * len(self.intervals)  # [start, open, high, low, close, volume]
+        # Earliest bar start still open per interval, so closed bars stay closed
+        self._last_start = [np.iinfo(np.int64).min] * len(self.intervals)
+        self._finished = [_BarBuffer() for _ in self.intervals]
+        self._last_cumulative = None
+        self.ticks = 0
+        self.late_ticks = 0
+
+    def add_tick(self, timestamp, price, volume=0.0):
+        """
+        Update every interval with one trade; finishes bars the tick moves past
+        """
+        timestamp_ns = to_ns(timestamp)
+        starts = [aligner.start(timestamp_ns) for aligner in self._aligners]
+        self.ticks += 1
+        if starts[self._finest] < self._last_start[self._finest]:
+            self.late_ticks += 1
+            return
+
+        price = float(price)
+        volume = self._tick_volume(float(volume or 0.0))
+        for i, start in enumerate(starts):
+            # Only intervals that do not nest in the finest one can see an accepted tick
+            # before their open bar; it is counted in that bar
+            start = max(start, self._last_start[i])
+            bar = self._current[i]
+            if bar is not None and start == bar[0]:
+                if price > bar[2]:
+                    bar[2] = price
+                elif price < bar[3]:
+                    bar[3] = price
+                bar[4] = price
+                bar[5] += volume
+            else:
+                if bar is not None:
+                    self._finish(i, bar)
+                self._current[i] = [start, price, price, price, price, volume]
+                self._last_start[i] = start
+
+    def add(self, tick):
+        """
+        Add a tick dict (e.g. {'dateTime': ..., 'ltp': ..., 'vol': ...})
+        """
+        self.add_tick(_tick_field(tick, 'timestamp'), _tick_field(tick, 'price'),
+                      _tick_field(tick, 'volume'))
+
+    def _tick_volume(self, volume):
+        if not self.cumulative_volume:
+            return volume
+        previous, self._last_cumulative = self._last_cumulative, volume
+        # The first report includes trades from before the stream started
+        if previous is None:
+            return 0.0
+        # A drop means the running total restarted (new session)
+        if volume < previous:
+            return volume
+        return volume - previous
+
+    def _finish(self, i, bar):
+        self._finished[i].append(bar)
+        if self.on_bar is not None:
+            self.on_bar(self.intervals[i], {
+                'datetime': pd.Timestamp(bar[0]),
+                **dict(zip(BAR_COLUMNS, bar[1:]))
+            })
+
+    def advance(self, timestamp):
+        """
+        Finish in-progress bars that have ended by timestamp (call on a timer so
+        bars close even when no ticks arrive)
+        """
+        timestamp_ns = to_ns(timestamp)
+        for i, aligner in enumerate(self._aligners):
+            start = aligner.start(timestamp_ns)
+            bar = self._current[i]
+            if bar is not None and start > bar[0]:
+                self._finish(i, bar)
+                self._current[i] = None
+            self._last_start[i] = max(self._last_start[i], start)
+
+    def current_bar(self, interval):
+        """
+        The in-progress bar for interval as a dict, or None
+        """
+        bar = self._current[self.intervals.index(interval)]
+        if bar is None:
+            return None
+        return {'datetime': pd.Timestamp(bar[0]), **dict(zip(BAR_COLUMNS, bar[1:]))}
+
+    def frame(self, interval, include_current=False):
+        """
+        Finished bars for interval as a DataFrame in the process_goldm_data layout
+        (DatetimeIndex named 'datetime', open/high/low/close/volume columns)
+        """
+        i = self.intervals.index(interval)
+        buffer = self._finished[i]
+        start = np.array(buffer.start, dtype=np.int64)
+        columns = {name: np.array(column, dtype=np.float64) for name, column in buffer.columns.items()}
+
+        bar = self._current[i]
+        if include_current and bar is not None:
+            start = np.append(start, bar[0])
+            columns = {name: np.append(columns[name], value)
+                       for name, value in zip(BAR_COLUMNS, bar[1:])}
+
+        index = pd.DatetimeIndex(start.view('M8[ns]'), name='datetime')
+        return pd.DataFrame(columns, index=index)
+
+    def frames(self, include_current=False):
+        return {interval: self.frame(interval, include_current) for interval in self.intervals}
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "finished_bars": {interval: len(buffer)
+                              for interval, buffer in zip(self.intervals, self._finished)}
+        }
+
+
+def read_tick_file(path):
+    """
+    Yield tick dicts from a replay file: CSV with a header row, or JSON lines (.jsonl)
+    """
+    with open(path, newline='') as f:
+        if path.endswith(('.jsonl', '.ndjson', '.json')):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def replay(ticks, aggregator, speed=None):
+    """
+    Feed ticks into aggregator. With speed set, sleep between ticks to replay at
+    that multiple of real time (1.0 = as recorded); otherwise as fast as possible.
+    """
+    previous_ns = None
+    started = time.perf_counter()
+    for tick in ticks:
+        if speed:
+            timestamp_ns = to_ns(_tick_field(tick, 'timestamp'))
+            if previous_ns is not None and timestamp_ns > previous_ns:
+                time.sleep((timestamp_ns - previous_ns) / 1e9 / speed)
+            previous_ns = timestamp_ns
+        aggregator.add(tick)
+    elapsed = time.perf_counter() - started
+    logger.info("replay_finished", ticks=aggregator.ticks, seconds=round(elapsed, 3),
+                **aggregator.stats()["finished_bars"])
+    return aggregator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build OHLCV bars from a tick replay file")
+    parser.add_argument("path", help="CSV (with header) or JSON-lines tick file")
+    parser.add_argument("--intervals", default="1m,5m,1H")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="Replay at this multiple of real time (default: as fast as possible)")
+    parser.add_argument("--cumulative-volume", action="store_true")
+    args = parser.parse_args()
+
+    aggregator = BarAggregator(args.intervals.split(","), cumulative_volume=args.cumulative_volume)
+    started = time.perf_counter()
+    replay(read_tick_file(args.path), aggregator, speed=args.speed)
+    elapsed = time.perf_counter() - started
+
+    print(f"Replayed {aggregator.ticks:,} ticks in {elapsed:.2f} s "
+          f"({aggregator.ticks / elapsed if elapsed else 0:,.0f} ticks/s)")
+    for interval, df in aggregator.frames(include_current=True).items():
+        print(f"\n=== {interval}: {len(df)} bars (last one in progress) ===")
+        print(df.tail().to_string())
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
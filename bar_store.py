@@ -0,0 +1,117 @@
+# Incremental local OHLCV store for Sharekhan historical data
+# Keeps one file per (exchange, scripcode, interval) and only asks the API for bars
+# newer than the last stored timestamp.
+
+import os
+import re
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from fetch_data import process_chunked_history, sort_and_dedupe
+from structured_logging import get_logger
+
+
+DEFAULT_STORE_DIR = "bar_store"
+
+logger = get_logger("bar_store")
+
+
+class LocalBarStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, exchange, scripcode, interval):
+        """
+        File path for a series, e.g. bar_store/MCX/GOLDM_5H.pkl
+        """
+        safe = lambda value: re.sub(r'[^A-Za-z0-9_.-]', '_', str(value))
+        return os.path.join(self.root, safe(exchange), f"{safe(scripcode)}_{safe(interval)}.pkl")
+
+    def load(self, exchange, scripcode, interval):
+        """
+        Load a stored series, or None if nothing has been stored yet
+        """
+        path = self.path_for(exchange, scripcode, interval)
+        if not os.path.exists(path):
+            return None
+        return pd.read_pickle(path)
+
+    def last_timestamp(self, exchange, scripcode, interval):
+        df = self.load(exchange, scripcode, interval)
+        if df is None or df.empty:
+            return None
+        return df.index.max()
+
+    def save(self, exchange, scripcode, interval, df):
+        """
+        Atomically replace the stored series
+        """
+        path = self.path_for(exchange, scripcode, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def merge(self, exchange, scripcode, interval, new_df, existing=None):
+        """
+        Merge new bars into the stored series (new rows win on duplicate timestamps)
+        and return the full series. Pass existing if it is already loaded.
+        """
+        if existing is None:
+            existing = self.load(exchange, scripcode, interval)
+        if existing is not None and not existing.empty:
+            merged = sort_and_dedupe(pd.concat([existing, new_df]))
+        else:
+            merged = new_df
+        self.save(exchange, scripcode, interval, merged)
+        return merged
+
+
+def get_historical_incremental(api, store, exchange="MCX", scripcode="GOLDM", interval="5H",
+                               days_back=30):
+    """
+    Return the full stored series for (exchange, scripcode, interval), fetching
+    only the bars missing since the last stored timestamp.
+
+    On the first run the last days_back days are fetched. Later runs re-request
+    from the day of the last stored bar, so a bar that was still forming at the
+    previous run gets replaced with its final values. If a chunk fails after its
+    retries, only the bars before it are stored, so it is fetched again next run.
+    """
+    existing = store.load(exchange, scripcode, interval)
+    to_date = datetime.now()
+
+    if existing is not None and not existing.empty:
+        from_date = existing.index.max().to_pydatetime()
+        logger.info("bar_store_loaded", exchange=exchange, scripcode=scripcode, interval=interval,
+                    bars=len(existing), last_timestamp=from_date)
+    else:
+        existing = None
+        from_date = to_date - timedelta(days=days_back)
+
+    # Long gaps (e.g. the first backfill) are split into parallel chunks
+    new_df, failed = process_chunked_history(api.iter_historical_chunks(
+        exchange=exchange,
+        scripcode=scripcode,
+        interval=interval,
+        from_date=from_date.strftime("%Y-%m-%d"),
+        to_date=to_date.strftime("%Y-%m-%d")
+    ))
+    if failed and new_df is not None:
+        # Only keep bars before the first failed window, so the stored series has no
+        # hole and the next run resumes from the missing window
+        first_missing = pd.Timestamp(failed[0][0])
+        if new_df.index.tz is not None:
+            first_missing = first_missing.tz_localize(new_df.index.tz)
+        logger.warning("bar_store_chunks_failed", exchange=exchange, scripcode=scripcode,
+                       interval=interval, windows=failed, kept_until=first_missing)
+        new_df = new_df[new_df.index < first_missing]
+    if new_df is None or new_df.empty:
+        # Nothing new (or the fetch failed) - serve what is on disk
+        return existing
+
+    logger.info("bar_store_merge", exchange=exchange, scripcode=scripcode, interval=interval,
+                bars=len(new_df))
+    return store.merge(exchange, scripcode, interval, new_df, existing=existing)
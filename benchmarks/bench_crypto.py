@@ -0,0 +1,49 @@
+# Micro-benchmark: per-item cost of encryptAPIString/decryptAPIString vs encrypt_many/decrypt_many
+# Run from the repository root: python benchmarks/bench_crypto.py [batch_size] [repeats]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from token_generate import encryptAPIString, decryptAPIString, encrypt_many, decrypt_many
+
+
+def best_of(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    plaintexts = [f"request_token_{i:08d}|secret_{i:08d}" for i in range(batch_size)]
+    ciphertexts = [encryptAPIString(p) for p in plaintexts]
+
+    # Both paths must produce identical output
+    assert encrypt_many(plaintexts) == ciphertexts
+    assert decrypt_many(ciphertexts) == [decryptAPIString(c) for c in ciphertexts]
+
+    results = {
+        "encryptAPIString": best_of(lambda: [encryptAPIString(p) for p in plaintexts], repeats),
+        "encrypt_many": best_of(lambda: encrypt_many(plaintexts), repeats),
+        "decryptAPIString": best_of(lambda: [decryptAPIString(c) for c in ciphertexts], repeats),
+        "decrypt_many": best_of(lambda: decrypt_many(ciphertexts), repeats),
+    }
+
+    print(f"=== Crypto micro-benchmark ({batch_size} items, best of {repeats}) ===")
+    for name, elapsed in results.items():
+        print(f"{name:<18} {elapsed * 1e6 / batch_size:8.2f} us/item   {elapsed * 1000:8.1f} ms total")
+
+    print(f"\nencrypt speedup: {results['encryptAPIString'] / results['encrypt_many']:.2f}x")
+    print(f"decrypt speedup: {results['decryptAPIString'] / results['decrypt_many']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
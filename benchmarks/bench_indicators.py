@@ -0,0 +1,182 @@
+# Indicator benchmark: vectorized IndicatorEngine on a 10M-bar series, incremental
+# updates, and a correctness check against straightforward per-bar reference loops
+# Run from the repository root: python benchmarks/bench_indicators.py [n_bars] [n_check]
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine, SMA, EMA, RSI, ATR, Bollinger
+
+
+def synthetic_bars(n_bars, seed=7):
+    """
+    Random-walk 1-minute OHLCV frame around 50,000
+    """
+    rng = np.random.default_rng(seed)
+    close = 50000.0 + np.cumsum(rng.normal(0.0, 5.0, n_bars))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0.0, 8.0, n_bars))
+    index = pd.date_range("2000-01-03 09:00", periods=n_bars, freq="min", name="datetime")
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(0, 5000, n_bars).astype(np.float64)
+    }, index=index)
+
+
+# ----------------------------- Reference loops -----------------------------
+
+def reference_sma(close, period):
+    out = [math.nan] * len(close)
+    for i in range(period - 1, len(close)):
+        out[i] = sum(close[i - period + 1:i + 1]) / period
+    return out
+
+
+def reference_bollinger(close, period, num_std):
+    mid, upper, lower = ([math.nan] * len(close) for _ in range(3))
+    for i in range(period - 1, len(close)):
+        window = close[i - period + 1:i + 1]
+        mean = sum(window) / period
+        std = math.sqrt(sum((x - mean) ** 2 for x in window) / period)
+        mid[i], upper[i], lower[i] = mean, mean + num_std * std, mean - num_std * std
+    return mid, upper, lower
+
+
+def reference_ema(close, period):
+    alpha = 2.0 / (period + 1)
+    out = []
+    value = close[0]
+    for x in close:
+        value = alpha * x + (1 - alpha) * value
+        out.append(value)
+    return out
+
+
+def _wilder(values, period, first):
+    """
+    Wilder smoothing of values[first:], seeded with their first period-long mean
+    """
+    out = [math.nan] * len(values)
+    seed_end = first + period
+    if seed_end > len(values):
+        return out
+    value = sum(values[first:seed_end]) / period
+    out[seed_end - 1] = value
+    for i in range(seed_end, len(values)):
+        value = (value * (period - 1) + values[i]) / period
+        out[i] = value
+    return out
+
+
+def reference_rsi(close, period):
+    gains = [0.0] + [max(close[i] - close[i - 1], 0.0) for i in range(1, len(close))]
+    losses = [0.0] + [max(close[i - 1] - close[i], 0.0) for i in range(1, len(close))]
+    out = []
+    for gain, loss in zip(_wilder(gains, period, 1), _wilder(losses, period, 1)):
+        if math.isnan(gain):
+            out.append(math.nan)
+        elif loss == 0:
+            out.append(100.0)
+        else:
+            out.append(100.0 - 100.0 / (1.0 + gain / loss))
+    return out
+
+
+def reference_atr(high, low, close, period):
+    true_range = [high[0] - low[0]] + [
+        max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        for i in range(1, len(close))
+    ]
+    return _wilder(true_range, period, 0)
+
+
+def reference_frame(df):
+    close, high, low = df['close'].tolist(), df['high'].tolist(), df['low'].tolist()
+    mid, upper, lower = reference_bollinger(close, 20, 2.0)
+    return pd.DataFrame({
+        'sma_20': reference_sma(close, 20),
+        'sma_50': reference_sma(close, 50),
+        'ema_12': reference_ema(close, 12),
+        'ema_26': reference_ema(close, 26),
+        'rsi_14': reference_rsi(close, 14),
+        'atr_14': reference_atr(high, low, close, 14),
+        'bb_mid_20': mid,
+        'bb_upper_20': upper,
+        'bb_lower_20': lower
+    }, index=df.index)
+
+
+def check(name, result, expected):
+    result = result[expected.columns]
+    same_nan = (result.isna() == expected.isna()).all().all()
+    error = ((result - expected).abs() / expected.abs().clip(lower=1.0)).max().max()
+    ok = same_nan and error < 1e-9
+    print(f"{name:<50} {'✓' if ok else '✗'}  max relative error {error:.2e}")
+    return ok
+
+
+def main():
+    n_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    n_check = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+
+    print(f"=== correctness on {n_check:,} bars ===")
+    df = synthetic_bars(n_check)
+    start = time.perf_counter()
+    expected = reference_frame(df)
+    reference_time = time.perf_counter() - start
+    start = time.perf_counter()
+    full = IndicatorEngine().update(df)
+    vectorized_time = time.perf_counter() - start
+    ok = check("vectorized vs reference loops", full, expected)
+
+    # Incremental: uneven slices, including ones shorter than the longest window
+    engine = IndicatorEngine()
+    bounds = [0, 1, 5, 30, 31, 1000, n_check // 2, n_check - 3, n_check]
+    pieces = [engine.update(df.iloc[a:b]) for a, b in zip(bounds, bounds[1:])]
+    ok &= check("incremental updates vs reference loops", pd.concat(pieces), expected)
+    print(f"{'reference loops':<50} {reference_time:8.3f} s")
+    print(f"{'IndicatorEngine':<50} {vectorized_time:8.3f} s  ({reference_time / vectorized_time:.0f}x)")
+
+    print(f"\n=== {n_bars:,} bars ===")
+    df = synthetic_bars(n_bars)
+    for indicator in (SMA(20), EMA(26), RSI(14), ATR(14), Bollinger(20, 2.0)):
+        start = time.perf_counter()
+        indicator.update(df)
+        print(f"{type(indicator).__name__ + ' -> ' + ', '.join(indicator.columns):<50} "
+              f"{time.perf_counter() - start:8.3f} s")
+
+    engine = IndicatorEngine()
+    start = time.perf_counter()
+    full = engine.update(df.iloc[:-1000])
+    print(f"{'IndicatorEngine, all defaults':<50} {time.perf_counter() - start:8.3f} s")
+
+    start = time.perf_counter()
+    for i in range(n_bars - 1000, n_bars):
+        engine.update(df.iloc[i:i + 1])
+    per_bar = (time.perf_counter() - start) / 1000
+    print(f"{'incremental update, 1 new bar':<50} {per_bar * 1e6:8.1f} us")
+
+    start = time.perf_counter()
+    pandas_sma = df['close'].rolling(20).mean()
+    pandas_ema = df['close'].ewm(span=26, adjust=False).mean()
+    print(f"{'pandas rolling(20).mean + ewm(26)':<50} {time.perf_counter() - start:8.3f} s")
+    agree = (np.allclose(full['sma_20'], pandas_sma.iloc[:-1000], rtol=1e-9, equal_nan=True)
+             and np.allclose(full['ema_26'], pandas_ema.iloc[:-1000], rtol=1e-9))
+    print(f"{'SMA/EMA agree with pandas':<50} {'✓' if agree else '✗'}")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Memory/time benchmark: process_goldm_data vs normalize_goldm_records, and
+# json.loads + process_goldm_data vs streaming decode of the raw response body
+# Run from the repository root: python benchmarks/bench_process.py [n_bars]
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from fetch_data import (process_goldm_data, normalize_goldm_records, _frame_from_columns,
+                        FIELD_MAPPING, NUMERIC_COLUMNS, STREAM_CHUNK_SIZE)
+from stream_decode import decode_historical_stream
+
+
+def synthetic_records(n_bars, shuffled=False):
+    """
+    Build raw API-style records (string timestamps, mixed numeric types)
+    """
+    start = datetime(2020, 1, 1, 9, 0)
+    records = []
+    price = 50000.0
+    for i in range(n_bars):
+        price += ((i * 7919) % 200 - 100) / 10.0
+        records.append({
+            'dateTime': (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            'open': price,
+            'high': price + 25.5,
+            'low': price - 25.5,
+            'ltp': str(round(price + 5.0, 2)),
+            'vol': (i * 31) % 5000
+        })
+    if shuffled:
+        records = records[::2] + records[1::2]
+    return records
+
+
+def measure(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    n_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    for shuffled in (False, True):
+        records = synthetic_records(n_bars, shuffled=shuffled)
+        label = "unordered" if shuffled else "ordered"
+        print(f"=== {n_bars:,} bars, {label} input ===")
+
+        baseline, base_time, base_peak = measure(process_goldm_data, records)
+        print(f"{'process_goldm_data':<40} {base_time:8.3f} s  peak {base_peak / 1e6:9.1f} MB  "
+              f"frame {baseline.memory_usage(deep=True).sum() / 1e6:8.1f} MB")
+
+        for downcast in (False, True):
+            df, elapsed, peak = measure(normalize_goldm_records, records, downcast=downcast)
+            name = f"normalize_goldm_records(downcast={downcast})"
+            print(f"{name:<40} {elapsed:8.3f} s  peak {peak / 1e6:9.1f} MB  "
+                  f"frame {df.memory_usage(deep=True).sum() / 1e6:8.1f} MB")
+            pd.testing.assert_frame_equal(df, baseline, check_dtype=not downcast,
+                                          check_freq=False, rtol=1e-6)
+        print()
+
+    # Whole response body, as get_goldm_historical_data / get_historical_frame see it
+    body = json.dumps({"status": "success", "data": synthetic_records(n_bars)}).encode("utf-8")
+    print(f"=== {n_bars:,} bars, {len(body) / 1e6:.1f} MB response body ===")
+
+    def parse_then_process():
+        return process_goldm_data(json.loads(body)["data"])
+
+    def stream_decode():
+        chunks = (body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE))
+        _, buffers = decode_historical_stream(chunks, FIELD_MAPPING, NUMERIC_COLUMNS)
+        return _frame_from_columns(*buffers.to_arrays())
+
+    baseline, base_time, base_peak = measure(parse_then_process)
+    print(f"{'json.loads + process_goldm_data':<40} {base_time:8.3f} s  peak {base_peak / 1e6:9.1f} MB")
+    df, elapsed, peak = measure(stream_decode)
+    print(f"{'decode_historical_stream':<40} {elapsed:8.3f} s  peak {peak / 1e6:9.1f} MB")
+    pd.testing.assert_frame_equal(df, baseline, check_freq=False, check_index_type=False)
+
+
+if __name__ == "__main__":
+    main()
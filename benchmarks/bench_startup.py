@@ -0,0 +1,83 @@
+# Cold-start benchmark: how long importing the app and the data client takes
+# Each run is a fresh interpreter with -X importtime, so nothing is cached in-process.
+#
+# Run from the repository root:
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py token_generate --runs 20 --top 15
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_once(module):
+    """
+    Import module in a fresh interpreter
+    Returns (wall seconds, {imported module: (depth, cumulative us)})
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    wall_time = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            timings[name] = (len(indent) // 2, int(cumulative))
+    return wall_time, timings
+
+
+def bench_module(module, runs, top):
+    wall_times = []
+    import_times = []
+    children = {}
+    # Discarded run to warm the OS file cache and __pycache__
+    import_once(module)
+    for _ in range(runs):
+        wall_time, timings = import_once(module)
+        wall_times.append(wall_time)
+        import_times.append(timings[module][1] / 1000)
+        # Direct imports of the module are logged one level deeper, just before it
+        for name, (depth, cumulative) in timings.items():
+            if depth == 1:
+                children.setdefault(name, []).append(cumulative / 1000)
+
+    print(f"\n=== import {module} ({runs} runs) ===")
+    print(f"{'process wall time':<40} median {statistics.median(wall_times) * 1000:8.1f} ms  "
+          f"min {min(wall_times) * 1000:8.1f} ms")
+    print(f"{'import ' + module:<40} median {statistics.median(import_times):8.1f} ms  "
+          f"min {min(import_times):8.1f} ms")
+
+    slowest = sorted(children.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    print("Slowest direct imports (median cumulative):")
+    for name, times in slowest[:top]:
+        print(f"  {name:<38} {statistics.median(times):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark")
+    parser.add_argument("modules", nargs="*", default=["token_generate", "fetch_data"])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        bench_module(module, args.runs, args.top)
+
+
+if __name__ == "__main__":
+    main()
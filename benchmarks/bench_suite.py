@@ -0,0 +1,226 @@
+# Offline benchmark suite: token route, data client and processing pipeline
+# Everything runs against benchmarks/mock_sharekhan.py, never the real API.
+#
+# Run from the repository root:
+#   python benchmarks/bench_suite.py
+#   python benchmarks/bench_suite.py --only pipeline --analyze-sizes 1000,10000000
+#   python benchmarks/bench_suite.py --latency-ms 80 --error-rate 0.02 --requests 2000
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from mock_sharekhan import MockConfig, start_mock_server, synthetic_bars
+
+
+def report(name, latencies, wall_time, errors=0, unit="req"):
+    """
+    Print throughput and p50/p95/p99 for a list of per-operation latencies (seconds)
+    """
+    latencies = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (np.nan,) * 3
+    throughput = len(latencies) / wall_time if wall_time else float('nan')
+    print(f"{name:<52} {throughput:10.1f} {unit}/s  p50 {p50:9.2f} ms  "
+          f"p95 {p95:9.2f} ms  p99 {p99:9.2f} ms  errors {errors}")
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(",") if size]
+
+
+# ----------------------------- /generate_token -----------------------------
+
+async def _run_token_route(n_requests, concurrency, distinct_users):
+    import httpx
+    import token_generate
+
+    app = token_generate.app
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with token_generate.lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def one(i):
+                nonlocal errors
+                form = {
+                    "app_id": f"bench-app-{i % distinct_users}",
+                    "secret_id": "bench-secret",
+                    "auth_code": f"auth-{i}"
+                }
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/generate_token", data=form)
+                    latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or "Token generated successfully" not in response.text:
+                    errors += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(n_requests)))
+            wall_time = time.perf_counter() - start
+
+    return latencies, wall_time, errors
+
+
+def bench_token_route(base_url, args):
+    # The app reads its upstream URL at import time
+    os.environ["SHAREKHAN_BASE_URL"] = base_url
+    # Measure the in-process cache only; a shared store would carry hits across runs
+    os.environ["TOKEN_STORE"] = "none"
+    print("\n=== /generate_token ===")
+    for distinct_users, label in ((args.requests, "all misses"), (10, "10 users, mostly cache hits")):
+        # Silence the per-request console output so it does not dominate the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, wall_time, errors = asyncio.run(
+                _run_token_route(args.requests, args.concurrency, distinct_users))
+        report(f"POST /generate_token ({label})", latencies, wall_time, errors)
+
+
+# ----------------------------- SharekhanDirectAPI -----------------------------
+
+def bench_data_client(base_url, args):
+    from fetch_data import SharekhanDirectAPI, TokenBucket, fetch_concurrently
+
+    print("\n=== SharekhanDirectAPI ===")
+    with contextlib.redirect_stdout(io.StringIO()):
+        # An effectively unlimited bucket, so the numbers measure the client, not the throttle
+        api = SharekhanDirectAPI("bench", "bench", "bench", base_url=base_url, backoff_factor=0.05,
+                                 rate_limiter=TokenBucket(rate=1e9))
+        api.login()
+
+    to_date = datetime(2024, 6, 30)
+    from_date = to_date - timedelta(days=args.fetch_days)
+    kwargs = {"interval": args.fetch_interval,
+              "from_date": from_date.strftime("%Y-%m-%d"),
+              "to_date": to_date.strftime("%Y-%m-%d")}
+
+    latencies = []
+    errors = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(args.fetches):
+            call_start = time.perf_counter()
+            if api.get_goldm_historical_data(**kwargs) is None:
+                errors += 1
+            latencies.append(time.perf_counter() - call_start)
+        wall_time = time.perf_counter() - start
+    report("get_goldm_historical_data (sequential)", latencies, wall_time, errors)
+
+    latencies = []
+    errors = 0
+    fetch_requests = {i: kwargs for i in range(args.fetches)}
+    with contextlib.redirect_stdout(io.StringIO()):
+        original = api.get_goldm_historical_data
+
+        def timed(**call_kwargs):
+            call_start = time.perf_counter()
+            try:
+                return original(**call_kwargs)
+            finally:
+                latencies.append(time.perf_counter() - call_start)
+
+        api.get_goldm_historical_data = timed
+        start = time.perf_counter()
+        for _, raw_data in fetch_concurrently(api, fetch_requests, max_workers=args.concurrency):
+            if raw_data is None:
+                errors += 1
+        wall_time = time.perf_counter() - start
+        api.get_goldm_historical_data = original
+        api.logout()
+    report(f"fetch_concurrently ({args.concurrency} workers)", latencies, wall_time, errors)
+
+
+# ----------------------------- Processing pipeline -----------------------------
+
+def synthetic_frame(n_bars, seed=0):
+    """
+    Build a processed-style OHLCV frame directly with NumPy (cheap even for 10M bars)
+    """
+    rng = np.random.default_rng(seed)
+    close = 50000 + rng.normal(0, 25, n_bars).cumsum()
+    spread = np.abs(rng.normal(0, 10, n_bars))
+    index = pd.date_range("2015-01-01 09:00", periods=n_bars, freq="min", name="datetime")
+    return pd.DataFrame({
+        "open": np.roll(close, 1),
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.integers(0, 5000, n_bars)
+    }, index=index)
+
+
+def time_runs(func, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_pipeline(args):
+    from fetch_data import process_goldm_data, analyze_goldm_data
+
+    print("\n=== Processing pipeline ===")
+    for n_bars in parse_sizes(args.process_sizes):
+        records = synthetic_bars(n_bars, datetime(2015, 1, 1, 9, 0), timedelta(minutes=1))
+        latencies = time_runs(lambda: process_goldm_data(records), args.repeats)
+        report(f"process_goldm_data ({n_bars:,} bars)", latencies, sum(latencies), unit="run")
+
+    for n_bars in parse_sizes(args.analyze_sizes):
+        df = synthetic_frame(n_bars)
+        latencies = time_runs(lambda: analyze_goldm_data(df), args.repeats)
+        report(f"analyze_goldm_data ({n_bars:,} bars)", latencies, sum(latencies), unit="run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--only", choices=["token", "client", "pipeline"], default=None)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-bars", type=int, default=None,
+                        help="Fixed number of bars per historical response")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--fetches", type=int, default=50)
+    parser.add_argument("--fetch-interval", default="5m")
+    parser.add_argument("--fetch-days", type=int, default=5)
+    # process_goldm_data takes raw API records (~470 bytes each as dicts), so 10M bars
+    # need ~5 GB before processing starts; add 10000000 on a machine with the memory
+    parser.add_argument("--process-sizes", default="1000,10000,100000,1000000",
+                        help="Bar counts for process_goldm_data (default stops at 1M, see above)")
+    parser.add_argument("--analyze-sizes", default="1000,10000,100000,1000000,10000000")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.max_bars)
+    server, base_url = start_mock_server(config=config)
+    print(f"Mock Sharekhan API at {base_url} (latency {args.latency_ms}±{args.jitter_ms} ms, "
+          f"error rate {args.error_rate:.1%})")
+
+    try:
+        if args.only in (None, "token"):
+            bench_token_route(base_url, args)
+        if args.only in (None, "client"):
+            bench_data_client(base_url, args)
+        if args.only in (None, "pipeline"):
+            bench_pipeline(args)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# Local stand-in for the Sharekhan API used by the benchmarks
+# Serves the auth, access/token and historical endpoints with configurable
+# latency, error rate and payload size so nothing has to reach api.sharekhan.com.
+#
+# Standalone:  python benchmarks/mock_sharekhan.py --port 9000 --latency-ms 40 --error-rate 0.01
+# Then run the app against it:
+#   SHAREKHAN_BASE_URL=http://127.0.0.1:9000/skapi/services uvicorn token_generate:app
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+API_PREFIX = "/skapi/services"
+INTERVAL_MINUTES = {'m': 1, 'H': 60, 'D': 1440, 'W': 10080}
+HISTORICAL_PATH = re.compile(rf"^{API_PREFIX}/historical/([^/]+)/([^/]+)/([^/]+)$")
+
+
+class MockConfig:
+    def __init__(self, latency_ms=20.0, jitter_ms=5.0, error_rate=0.0, max_bars=None,
+                 token_ttl=3600):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # Cap (or, when the range is too short, fix) the number of bars per historical response
+        self.max_bars = max_bars
+        self.token_ttl = token_ttl
+
+
+def synthetic_bars(n_bars, start, step, seed=0, price=50000.0):
+    """
+    Generate n_bars API-style OHLCV records starting at start, one every step
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(n_bars):
+        open_price = price
+        price = max(1.0, price + rng.gauss(0, 25))
+        records.append({
+            "dateTime": (start + step * i).strftime("%Y-%m-%d %H:%M:%S"),
+            "open": round(open_price, 2),
+            "high": round(max(open_price, price) + abs(rng.gauss(0, 10)), 2),
+            "low": round(min(open_price, price) - abs(rng.gauss(0, 10)), 2),
+            "close": round(price, 2),
+            "volume": rng.randint(0, 5000)
+        })
+    return records
+
+
+def _interval_step(interval):
+    match = re.fullmatch(r"(\d+)(m|H|D|W)", interval)
+    if not match:
+        return timedelta(hours=1)
+    count, unit = match.groups()
+    return timedelta(minutes=int(count) * INTERVAL_MINUTES[unit])
+
+
+class MockSharekhanHandler(BaseHTTPRequestHandler):
+    config = MockConfig()
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _simulate(self):
+        """
+        Sleep for the configured latency; return True if this request should fail
+        """
+        delay = max(0.0, random.gauss(self.config.latency_ms, self.config.jitter_ms)) / 1000.0
+        time.sleep(delay)
+        return random.random() < self.config.error_rate
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        self._read_body()
+        path = urlparse(self.path).path
+        if self._simulate():
+            return self._send_json(503, {"status": "error", "message": "Simulated upstream failure"})
+
+        if path == f"{API_PREFIX}/access/token":
+            return self._send_json(200, {
+                "status": "success",
+                "message": "Access token generated",
+                "timestamp": datetime.now().isoformat(),
+                "data": {
+                    "token": f"mock-access-{random.getrandbits(64):016x}",
+                    "expires_in": self.config.token_ttl
+                }
+            })
+        if path == f"{API_PREFIX}/auth/login":
+            return self._send_json(200, {"status": "success", "data": {"authToken": "mock-auth-token"}})
+        if path == f"{API_PREFIX}/auth/logout":
+            return self._send_json(200, {"status": "success"})
+        return self._send_json(404, {"status": "error", "message": f"Unknown endpoint {path}"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        match = HISTORICAL_PATH.match(url.path)
+        if self._simulate():
+            return self._send_json(503, {"status": "error", "message": "Simulated upstream failure"})
+        if not match:
+            return self._send_json(404, {"status": "error", "message": f"Unknown endpoint {url.path}"})
+
+        exchange, scripcode, interval = match.groups()
+        params = parse_qs(url.query)
+        try:
+            from_date = datetime.strptime(params["fromDate"][0], "%Y-%m-%d")
+            to_date = datetime.strptime(params["toDate"][0], "%Y-%m-%d") + timedelta(days=1)
+        except (KeyError, ValueError):
+            return self._send_json(400, {"status": "error", "message": "fromDate/toDate required"})
+
+        step = _interval_step(interval)
+        n_bars = max(0, int((to_date - from_date) / step))
+        if self.config.max_bars is not None:
+            n_bars = self.config.max_bars
+        seed = zlib.crc32(f"{exchange}/{scripcode}/{interval}/{params['fromDate'][0]}".encode())
+        return self._send_json(200, {
+            "status": "success",
+            "data": synthetic_bars(n_bars, from_date, step, seed=seed)
+        })
+
+
+class MockServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 makes concurrent benchmark clients queue in
+    # the kernel (or get reset), so latencies would measure the backlog, not the app
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start_mock_server(host="127.0.0.1", port=0, config=None):
+    """
+    Start the stand-in server on a background thread
+    Returns (server, base_url); call server.shutdown() when done
+    """
+    handler = type("ConfiguredMockHandler", (MockSharekhanHandler,), {"config": config or MockConfig()})
+    server = MockServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}{API_PREFIX}"
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Sharekhan API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-bars", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.max_bars)
+    server, base_url = start_mock_server(args.host, args.port, config)
+    print(f"Mock Sharekhan API listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Columnar binary storage for OHLCV frames
+# Alternative to timestamped CSV exports: each column is a raw little-endian
+# array file plus a small meta.json, so new bars can be appended in place and
+# the data can be memory-mapped back without parsing.
+#
+# Layout of a store directory (e.g. goldm_5hr_data.cols/):
+#   meta.json        - row count, index and column dtypes
+#   __index__.bin    - datetime index as int64 nanoseconds
+#   <column>.bin     - one file per column
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from structured_logging import get_logger
+
+
+INDEX_FILE = "__index__.bin"
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+logger = get_logger("columnar")
+
+
+def _column_file(path, name):
+    return os.path.join(path, f"{name}.bin")
+
+
+def read_meta(path):
+    """
+    Read a store's metadata, or None if the store does not exist yet
+    """
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta):
+    # Written last and atomically, so a crash mid-append leaves the previous row count in force
+    tmp_path = os.path.join(path, f"{META_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def _append_array(file_path, array, stored_rows):
+    """
+    Append array to a column file, first dropping any bytes past stored_rows
+    (left over from an append that did not finish)
+    """
+    mode = "r+b" if os.path.exists(file_path) else "wb"
+    with open(file_path, mode) as f:
+        f.truncate(stored_rows * array.dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(array).tobytes())
+
+
+def save_columnar(df, path, append=True):
+    """
+    Write a DatetimeIndex-ed OHLCV frame to a columnar store directory
+
+    With append=True (default) rows are added to an existing store. If the frame
+    starts at or before the last stored timestamp, the stored rows from its first
+    timestamp on are replaced by the frame, so revised bars (e.g. the last one, which
+    was still forming when it was saved) are updated. Only numeric/bool columns are
+    stored. Returns the number of rows written.
+    """
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("save_columnar expects a DatetimeIndex")
+
+    meta = read_meta(path) if append else None
+    if meta is None:
+        os.makedirs(path, exist_ok=True)
+        columns = [name for name in df.columns
+                   if df[name].dtype.kind in 'biuf' and isinstance(name, str)]
+        skipped = [name for name in df.columns if name not in columns]
+        if skipped:
+            logger.warning("columnar_columns_skipped", path=path, columns=skipped)
+        meta = {
+            "version": FORMAT_VERSION,
+            "rows": 0,
+            "index": {"name": df.index.name, "tz": str(df.index.tz) if df.index.tz else None},
+            "columns": [{"name": name, "dtype": df[name].dtype.newbyteorder('<').str}
+                        for name in columns],
+            "last_timestamp": None
+        }
+    else:
+        stored = [column["name"] for column in meta["columns"]]
+        missing = [name for name in stored if name not in df.columns]
+        if missing:
+            raise ValueError(f"Frame is missing stored columns: {missing}")
+        # Timestamps are stored as UTC nanoseconds for tz-aware stores and as wall-clock
+        # nanoseconds for naive ones, so mixing the two would shift the appended bars
+        stored_tz = meta["index"]["tz"]
+        if (stored_tz is None) != (df.index.tz is None):
+            raise ValueError(f"Frame index time zone {df.index.tz} does not match the store's "
+                             f"{stored_tz}; localize or convert it first")
+
+    df = df.sort_index(kind='mergesort')
+    df = df[~df.index.duplicated(keep='last')]
+    index_values = df.index.as_unit('ns').asi8
+    if df.empty:
+        return 0
+
+    rows = meta["rows"]
+    if meta["last_timestamp"] is not None and index_values[0] <= meta["last_timestamp"]:
+        stored_index = _map_array(os.path.join(path, INDEX_FILE), np.dtype('<i8'), rows)
+        overlap_start = int(np.searchsorted(stored_index, index_values[0], side='left'))
+        last_kept = int(stored_index[overlap_start - 1]) if overlap_start else None
+        del stored_index
+        logger.info("columnar_rows_replaced", path=path, rows=rows - overlap_start)
+        # Shrink the store first, so an interrupted rewrite leaves it ending at the last
+        # untouched row rather than mixing old and new bars
+        rows = overlap_start
+        meta["rows"] = rows
+        meta["last_timestamp"] = last_kept
+        _write_meta(path, meta)
+
+    index_values = index_values.astype('<i8')
+    _append_array(os.path.join(path, INDEX_FILE), index_values, rows)
+    for column in meta["columns"]:
+        values = df[column["name"]].to_numpy(dtype=np.dtype(column["dtype"]))
+        _append_array(_column_file(path, column["name"]), values, rows)
+
+    meta["rows"] = rows + len(df)
+    meta["last_timestamp"] = int(index_values[-1])
+    _write_meta(path, meta)
+    return len(df)
+
+
+def _map_array(file_path, dtype, rows):
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(file_path, dtype=dtype, mode="r", shape=(rows,))
+
+
+def load_columnar(path, columns=None):
+    """
+    Open a columnar store as a DataFrame backed by read-only memory maps
+
+    Pages are only read from disk when a column is actually touched, so
+    analysis can start on multi-year minute data without loading it all.
+    Pass columns to map only a subset.
+    """
+    meta = read_meta(path)
+    if meta is None:
+        raise FileNotFoundError(f"No columnar store at {path}")
+
+    rows = meta["rows"]
+    index_values = _map_array(os.path.join(path, INDEX_FILE), np.dtype('<i8'), rows)
+    index = pd.DatetimeIndex(index_values.view('M8[ns]'), name=meta["index"]["name"])
+    if meta["index"]["tz"]:
+        index = index.tz_localize("UTC").tz_convert(meta["index"]["tz"])
+
+    data = {}
+    for column in meta["columns"]:
+        if columns is not None and column["name"] not in columns:
+            continue
+        data[column["name"]] = _map_array(_column_file(path, column["name"]),
+                                          np.dtype(column["dtype"]), rows)
+
+    # copy=False keeps each column as its own memory-mapped block
+    return pd.DataFrame(data, index=index, copy=False)
@@ -0,0 +1,309 @@
+# Continuous-contract series stitched from GOLDM expiries
+# Contract frames (e.g. from fetch_goldm_contracts or the bar store) are aligned on one
+# time axis, rolled forward to the next expiry when it takes over, and back-adjusted
+# or ratio-adjusted so the series has no roll gaps. The stitched series is cached on
+# disk and later runs only stitch the bars newer than the cached ones.
+#
+#   python continuous.py --interval 5H --method backadjust
+
+import argparse
+import os
+import pickle
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from bar_store import DEFAULT_STORE_DIR, LocalBarStore, get_historical_incremental
+from fetch_data import SharekhanDirectAPI, NUMERIC_COLUMNS, get_goldm_scrip_codes
+from structured_logging import get_logger, setup_logging
+
+
+logger = get_logger("continuous")
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+METHODS = ('backadjust', 'ratio')
+# volume: roll when the next contract trades more volume in a bar or the front stops trading
+# expiry: roll only once the front contract has no more bars
+ROLL_RULES = ('volume', 'expiry')
+CACHE_VERSION = 1
+
+
+def default_cache_path(name="GOLDM", interval="5H", root=DEFAULT_STORE_DIR):
+    return os.path.join(root, "continuous", f"{name}_{interval}_continuous.pkl")
+
+
+def _align(contracts, since=None):
+    """
+    Reindex every contract on the union of their timestamps
+    Returns (index, {column: array of shape (contracts, bars)})
+    """
+    frames = []
+    for df in contracts.values():
+        if df is None:
+            df = pd.DataFrame(columns=['close'], index=pd.DatetimeIndex([], name='datetime'))
+        frames.append(df if since is None else df.loc[since:])
+
+    index = reduce(lambda left, right: left.union(right), (df.index for df in frames))
+    index = pd.DatetimeIndex(index, name='datetime')
+    columns = [column for column in NUMERIC_COLUMNS if any(column in df.columns for df in frames)]
+    values = {
+        column: np.vstack([
+            df[column].reindex(index).to_numpy(dtype=np.float64) if column in df.columns
+            else np.full(len(index), np.nan)
+            for df in frames
+        ])
+        for column in columns
+    }
+    return index, values
+
+
+def _find_rolls(close, volume, roll_on, first_position=0):
+    """
+    Bar positions where each later contract becomes active (forward-only)
+    Returns a list whose j-th entry is the first bar of contract j + 1; shorter than
+    the number of contracts if not every roll has happened yet.
+    """
+    present = ~np.isnan(close)
+    positions = np.arange(close.shape[1])
+    rolls = []
+    earliest = first_position
+    for k in range(1, close.shape[0]):
+        traded = np.flatnonzero(present[k - 1])
+        front_last = traded[-1] if len(traded) else -1
+        takeover = present[k] & (positions > front_last)
+        if roll_on == 'volume' and volume is not None:
+            takeover |= present[k] & present[k - 1] & (volume[k] > volume[k - 1])
+        candidates = np.flatnonzero(takeover[earliest:])
+        if not len(candidates):
+            break
+        earliest += candidates[0]
+        rolls.append(earliest)
+    return rolls
+
+
+def _roll_adjustments(close, rolls, method):
+    """
+    Price gap (backadjust) or ratio (ratio) between the new and the old contract at
+    each roll, measured on the bar before the roll
+    """
+    # Last traded close of every contract at each bar
+    last_close = pd.DataFrame(close.T).ffill().to_numpy().T
+    adjustments = []
+    for k, position in enumerate(rolls, start=1):
+        if position == 0:
+            adjustments.append(0.0 if method == 'backadjust' else 1.0)
+            continue
+        old = last_close[k - 1, position - 1]
+        new = close[k, position - 1]
+        if np.isnan(new):
+            new = close[k, position]
+        if method == 'backadjust':
+            adjustments.append(0.0 if np.isnan(old) else float(new - old))
+        else:
+            adjustments.append(1.0 if np.isnan(old) or old <= 0 else float(new / old))
+    return adjustments
+
+
+def _stitch(contracts, method, roll_on, since=None):
+    """
+    Stitch contracts (ordered nearest expiry first) into one series
+
+    Returns (frame, rolls). Prices are adjusted relative to the last active contract;
+    rows where the active contract has no bar are dropped. With since set, only bars
+    from since on are used and the first bar cannot be a roll (it overlaps the cache).
+    """
+    names = list(contracts)
+    index, values = _align(contracts, since)
+    close = values['close']
+    rolls = _find_rolls(close, values.get('volume'), roll_on, first_position=0 if since is None else 1)
+    adjustments = _roll_adjustments(close, rolls, method)
+
+    positions = np.arange(len(index))
+    segment = np.searchsorted(rolls, positions, side='right')
+    if method == 'backadjust':
+        total = np.concatenate(([0.0], np.cumsum(adjustments)))
+        segment_adjustment = total[-1] - total
+    else:
+        total = np.concatenate(([1.0], np.cumprod(adjustments)))
+        segment_adjustment = total[-1] / total
+
+    keep = ~np.isnan(close[segment, positions])
+    segment, positions = segment[keep], positions[keep]
+    adjustment = segment_adjustment[segment]
+
+    columns = {}
+    for column, matrix in values.items():
+        active = matrix[segment, positions]
+        if column in PRICE_COLUMNS:
+            active = active + adjustment if method == 'backadjust' else active * adjustment
+        columns[column] = active
+    columns['contract'] = pd.Categorical.from_codes(segment, categories=names)
+    frame = pd.DataFrame(columns, index=index[keep])
+
+    roll_records = [
+        {'datetime': index[position], 'from': names[k], 'to': names[k + 1],
+         'adjustment': adjustments[k]}
+        for k, position in enumerate(rolls)
+    ]
+    return frame, roll_records
+
+
+class ContinuousContract:
+    """
+    Cached continuous series over contracts ordered nearest expiry first
+
+    update(contracts) stitches from scratch the first time (or when the contract list,
+    method or roll rule changed) and afterwards only stitches bars from the last cached
+    bar on: the new bars are appended and, if the next contract took over, the new roll
+    adjustment is applied to the cached history in one vectorized step. The cached last
+    bar is replaced by its latest values, as bars still forming get revised.
+    """
+
+    def __init__(self, method="backadjust", roll_on="volume", cache_path=None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown adjustment method: {method}")
+        if roll_on not in ROLL_RULES:
+            raise ValueError(f"Unknown roll rule: {roll_on}")
+        self.method = method
+        self.roll_on = roll_on
+        self.cache_path = cache_path
+        self._state = None
+
+    @property
+    def frame(self):
+        state = self._load()
+        return None if state is None else state['frame']
+
+    @property
+    def rolls(self):
+        state = self._load()
+        return pd.DataFrame(state['rolls'] if state else [],
+                            columns=['datetime', 'from', 'to', 'adjustment'])
+
+    def _load(self):
+        if self._state is None and self.cache_path and os.path.exists(self.cache_path):
+            with open(self.cache_path, 'rb') as f:
+                self._state = pickle.load(f)
+        return self._state
+
+    def _save(self, state):
+        self._state = state
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
+    def build(self, contracts):
+        """
+        Stitch all bars from scratch and replace the cache
+        """
+        frame, rolls = _stitch(contracts, self.method, self.roll_on)
+        active = frame['contract'].iloc[-1] if len(frame) else None
+        self._save({
+            'version': CACHE_VERSION, 'method': self.method, 'roll_on': self.roll_on,
+            'contracts': list(contracts), 'active': active, 'frame': frame, 'rolls': rolls
+        })
+        logger.info("continuous_built", bars=len(frame), rolls=len(rolls), active=active)
+        return frame
+
+    def update(self, contracts):
+        """
+        Extend the cached series with new bars; returns the full stitched frame
+        """
+        state = self._load()
+        if (state is None or state['version'] != CACHE_VERSION or state['method'] != self.method
+                or state['roll_on'] != self.roll_on or state['contracts'] != list(contracts)
+                or state['active'] is None):
+            return self.build(contracts)
+
+        cached = state['frame']
+        last_timestamp = cached.index[-1]
+        names = state['contracts']
+        remaining = {name: contracts[name] for name in names[names.index(state['active']):]}
+        tail, rolls = _stitch(remaining, self.method, self.roll_on, since=last_timestamp)
+        if tail.empty or tail.index[0] != last_timestamp:
+            # The active contract no longer has the cached last bar, so history changed
+            logger.warning("continuous_rebuild", reason="last cached bar missing",
+                           last_timestamp=last_timestamp)
+            return self.build(contracts)
+        if len(tail) == 1 and not rolls and tail.iloc[0].equals(cached.iloc[-1]):
+            return cached
+
+        history = cached.iloc[:-1].copy()
+        if rolls:
+            adjustments = [roll['adjustment'] for roll in rolls]
+            if self.method == 'backadjust':
+                history[PRICE_COLUMNS] += sum(adjustments)
+            else:
+                history[PRICE_COLUMNS] *= float(np.prod(adjustments))
+        frame = pd.concat([history, tail])
+        frame['contract'] = pd.Categorical(frame['contract'], categories=names)
+
+        self._save({**state, 'active': tail['contract'].iloc[-1], 'frame': frame,
+                    'rolls': state['rolls'] + rolls})
+        logger.info("continuous_updated", new_bars=len(tail) - 1, rolls=len(rolls),
+                    active=tail['contract'].iloc[-1])
+        return frame
+
+
+def get_continuous_incremental(api, store, continuous, exchange="MCX", interval="5H",
+                               days_back=30, contracts=None):
+    """
+    Update every contract in the local bar store (fetching only missing bars) and
+    extend the cached continuous series with them
+    """
+    contracts = contracts or get_goldm_scrip_codes()
+    frames = {
+        name: get_historical_incremental(api, store, exchange, scripcode, interval, days_back)
+        for name, scripcode in contracts.items()
+    }
+    return continuous.update(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the continuous GOLDM series")
+    parser.add_argument("--interval", default="5H")
+    parser.add_argument("--days-back", type=int, default=30)
+    parser.add_argument("--method", default="backadjust", choices=METHODS)
+    parser.add_argument("--roll-on", default="volume", choices=ROLL_RULES)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="Bar store directory")
+    parser.add_argument("--output", default=None, help="Also write the series to this CSV")
+    parser.add_argument("--base-url", default=os.getenv("SHAREKHAN_BASE_URL",
+                                                        "https://api.sharekhan.com/skapi/services"))
+    args = parser.parse_args()
+
+    api = SharekhanDirectAPI(
+        api_key=os.getenv("SHAREKHAN_API_KEY", ""),
+        secret_key=os.getenv("SHAREKHAN_SECRET_KEY", ""),
+        user_id=os.getenv("SHAREKHAN_USER_ID", ""),
+        base_url=args.base_url
+    )
+    if not api.login():
+        print("Failed to login. Please check your credentials.")
+        return
+
+    continuous = ContinuousContract(args.method, args.roll_on,
+                                    default_cache_path("GOLDM", args.interval, args.store))
+    try:
+        df = get_continuous_incremental(api, LocalBarStore(args.store), continuous,
+                                        interval=args.interval, days_back=args.days_back)
+    finally:
+        api.logout()
+
+    if df is None or df.empty:
+        print("✗ No data for any contract")
+        return
+    print(df.tail().to_string())
+    print(f"\n✓ {len(df)} bars, {len(continuous.rolls)} rolls, cached at {continuous.cache_path}")
+    if args.output:
+        df.to_csv(args.output)
+        print(f"✓ Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
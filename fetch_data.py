@@ -2,19 +2,199 @@
 # Direct REST API calls to https://api.sharekhan.com/skapi/services/historical/
 
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
 import json
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import random
+import threading
 import time
 
+from lazy_imports import lazy_module
+from metrics import REGISTRY, UPSTREAM_LATENCY, UPSTREAM_IN_FLIGHT, timed_stage
+from structured_logging import LOG_SAMPLE_RATE, get_logger, setup_logging
+
+# pandas/numpy are only imported when data is first processed, so logging in or
+# fetching raw data does not pay for them
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+
+logger = get_logger("fetch_data")
+
+# Sharekhan historical API rate limit shared by all concurrent fetches in this process
+# Adjust to the limit on your API plan
+HISTORICAL_RATE_LIMIT = 3  # requests per second
+HISTORICAL_BURST = 3       # requests allowed back-to-back before throttling
+MAX_FETCH_WORKERS = 4
+
+# Max days per request when splitting long date ranges, by interval
+CHUNK_DAYS = {
+    '1m': 5, '3m': 10, '5m': 15, '10m': 30, '15m': 30, '30m': 60,
+    '1H': 90, '5H': 180, '1D': 365, '1W': 1825
+}
+DEFAULT_CHUNK_DAYS = 30
+# Longest Retry-After (seconds) worth waiting for; a longer one fails the request
+MAX_RETRY_AFTER = 60
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes read per step when streaming historical responses
+
+# Map API response fields to standard OHLCV format
+# Adjust these field names based on actual API response structure
+FIELD_MAPPING = {
+    'timestamp': 'datetime',
+    'dateTime': 'datetime',
+    'time': 'datetime',
+    'open': 'open',
+    'high': 'high',
+    'low': 'low',
+    'close': 'close',
+    'ltp': 'close',  # Last traded price as close
+    'volume': 'volume',
+    'vol': 'volume'
+}
+NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# HTTP status codes worth retrying for idempotent requests
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "upstream_retries_total", "Retried Sharekhan API calls by endpoint")
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "upstream_hedged_requests_total", "Duplicate (hedged) historical reads sent")
+
 class SharekhanDirectAPI:
-    def __init__(self, api_key, secret_key, user_id):
+    def __init__(self, api_key, secret_key, user_id, connect_timeout=3.05, read_timeout=30,
+                 max_retries=3, backoff_factor=0.5, max_backoff=10, pool_maxsize=32,
+                 hedge_after=None, base_url="https://api.sharekhan.com/skapi/services",
+                 rate_limiter=None):
+        """
+        Parameters:
+        - connect_timeout / read_timeout: Per-request socket timeouts in seconds
+        - max_retries: Retries for idempotent GETs on connection errors, timeouts and 429/5xx
+        - backoff_factor / max_backoff: Full-jitter exponential backoff between retries
+        - pool_maxsize: Connections kept per host (size it to the number of fetch threads)
+        - hedge_after: If set, historical reads still pending after this many seconds
+          get a duplicate request and the first response wins
+        - base_url: API root (point it at a stand-in server for offline benchmarks)
+        - rate_limiter: TokenBucket every historical request attempt (retries and hedges
+          included) takes a token from (defaults to the process-wide historical bucket)
+        """
         self.api_key = api_key
         self.secret_key = secret_key
         self.user_id = user_id
-        self.base_url = "https://api.sharekhan.com/skapi/services"
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.rate_limiter = rate_limiter
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.auth_token = None
+    
+    def _check_auth_error(self, error):
+        """
+        Forget the session token when the API rejected it (401), so callers can tell
+        an expired login from other failures by auth_token being None
+        """
+        if getattr(error.response, "status_code", None) == 401:
+            logger.warning("auth_token_rejected")
+            self.auth_token = None
+            self.session.headers.pop('Authorization', None)
+    
+    def _limiter(self, endpoint):
+        """
+        Token bucket for endpoint, or None if it is not rate limited
+        """
+        if endpoint != "historical":
+            return None
+        return self.rate_limiter or _historical_bucket
+    
+    def _hedge_pool(self):
+        # Threads sending hedged requests share one API object, so create the pool once
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=8)
+            return self._hedge_executor
+    
+    def _send(self, method, url, hedge=False, try_acquire=None, **kwargs):
+        """
+        Send one request, optionally hedged with a delayed duplicate
+        The duplicate is only sent if try_acquire (the rate limiter's non-blocking
+        take, when there is one) grants a token, so hedging never exceeds the rate limit.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if not (hedge and self.hedge_after):
+            return self.session.request(method, url, **kwargs)
+        
+        executor = self._hedge_pool()
+        pending = {executor.submit(self.session.request, method, url, **kwargs)}
+        done, _ = wait(pending, timeout=self.hedge_after)
+        if not done and (try_acquire is None or try_acquire()):
+            UPSTREAM_HEDGES.inc()
+            pending.add(executor.submit(self.session.request, method, url, **kwargs))
+        
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+                    continue
+                if response.status_code < 500 or not pending:
+                    # Release the losing request's connection (matters for stream=True)
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    return response
+                response.close()
+        raise error
+    
+    def _request(self, method, url, endpoint, hedge=False, **kwargs):
+        """
+        Send a request with timeouts; idempotent GETs are retried with jittered
+        exponential backoff on connection errors, timeouts and 429/5xx responses,
+        waiting at least as long as the response's Retry-After asks. This is the only
+        retry layer, and every attempt of a historical request takes a rate-limit token.
+        Every attempt is recorded in the upstream latency metrics under endpoint; time
+        spent waiting for a token is not.
+        """
+        attempts = self.max_retries + 1 if method.upper() == "GET" else 1
+        limiter = self._limiter(endpoint)
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            if attempt:
+                UPSTREAM_RETRIES.inc(endpoint=endpoint)
+            retry_after = 0
+            try_acquire = None
+            if limiter is not None:
+                limiter.acquire()
+                try_acquire = limiter.try_acquire
+            try:
+                with UPSTREAM_IN_FLIGHT.track(endpoint=endpoint), \
+                        UPSTREAM_LATENCY.time(endpoint=endpoint, outcome="error") as labels:
+                    response = self._send(method, url, hedge=hedge, try_acquire=try_acquire, **kwargs)
+                    labels["outcome"] = str(response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                retry_after = _retry_after_seconds(response)
+                if retry_after > MAX_RETRY_AFTER:
+                    logger.warning("retry_after_too_long", endpoint=endpoint,
+                                   status=response.status_code, retry_after=retry_after)
+                    return response
+                response.close()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last_attempt:
+                    raise
+            # Full jitter keeps retrying clients from hitting the API in lockstep
+            backoff = random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+            time.sleep(max(backoff, retry_after))
         
     def login(self):
         """
@@ -29,7 +209,7 @@ class SharekhanDirectAPI:
         }
         
         try:
-            response = self.session.post(login_url, json=login_payload)
+            response = self._request("POST", login_url, "auth/login", json=login_payload)
             response.raise_for_status()
             
             auth_data = response.json()
@@ -40,16 +220,17 @@ class SharekhanDirectAPI:
                     'Authorization': f'Bearer {self.auth_token}',
                     'Content-Type': 'application/json'
                 })
-                print("✓ Login successful")
+                logger.info("login_successful")
                 return True
             else:
-                print(f"✗ Login failed: {auth_data.get('message', 'Unknown error')}")
+                logger.error("login_failed", message=auth_data.get('message', 'Unknown error'))
                 return False
                 
         except requests.exceptions.RequestException as e:
-            print(f"✗ Login error: {e}")
+            logger.error("login_error", error=str(e))
             return False
     
+    @timed_stage("fetch")
     def get_goldm_historical_data(self, exchange="MCX", scripcode="GOLDM", interval="5H", 
                                   days_back=30, from_date=None, to_date=None):
         """
@@ -65,9 +246,88 @@ class SharekhanDirectAPI:
         """
         
         if not self.auth_token:
-            print("✗ Please login first")
+            logger.error("not_logged_in", hint="Please login first")
+            return None
+        
+        endpoint_url, params = self._historical_request_args(exchange, scripcode, interval,
+                                                             days_back, from_date, to_date)
+        
+        try:
+            response = self._request("GET", endpoint_url, "historical", params=params, hedge=True)
+            response.raise_for_status()
+            
+            data = response.json()
+            
+            if data.get('status') == 'success':
+                historical_data = data.get('data', [])
+                logger.info("historical_fetch_completed", exchange=exchange, scripcode=scripcode,
+                            interval=interval, points=len(historical_data), sample=LOG_SAMPLE_RATE)
+                return historical_data
+            else:
+                logger.error("historical_api_error", exchange=exchange, scripcode=scripcode,
+                             interval=interval, message=data.get('message', 'Unknown error'))
+                return None
+                
+        except requests.exceptions.RequestException as e:
+            logger.error("historical_request_error", exchange=exchange, scripcode=scripcode,
+                         interval=interval, error=str(e))
+            self._check_auth_error(e)
+            return None
+    
+    @timed_stage("fetch")
+    def get_historical_frame(self, exchange="MCX", scripcode="GOLDM", interval="5H",
+                             days_back=30, from_date=None, to_date=None,
+                             chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Streaming alternative to get_goldm_historical_data + process_goldm_data
+        
+        The response is parsed as it downloads and each record goes straight into
+        typed column buffers, so neither the full JSON text nor the list of record
+        dicts is held in memory. Returns a DataFrame in the process_goldm_data
+        layout, or None on errors.
+        """
+        from stream_decode import decode_historical_stream
+        
+        if not self.auth_token:
+            logger.error("not_logged_in", hint="Please login first")
+            return None
+        
+        endpoint_url, params = self._historical_request_args(exchange, scripcode, interval,
+                                                             days_back, from_date, to_date)
+        
+        try:
+            response = self._request("GET", endpoint_url, "historical", params=params, hedge=True,
+                                     stream=True)
+            with response:
+                response.raise_for_status()
+                fields, buffers = decode_historical_stream(
+                    response.iter_content(chunk_size), FIELD_MAPPING, NUMERIC_COLUMNS,
+                    encoding=response.encoding
+                )
+        except requests.exceptions.RequestException as e:
+            logger.error("historical_request_error", exchange=exchange, scripcode=scripcode,
+                         interval=interval, error=str(e))
+            self._check_auth_error(e)
+            return None
+        except ValueError as e:
+            logger.error("historical_decode_error", exchange=exchange, scripcode=scripcode,
+                         interval=interval, error=str(e))
             return None
         
+        if fields.get('status') != 'success':
+            logger.error("historical_api_error", exchange=exchange, scripcode=scripcode,
+                         interval=interval, message=fields.get('message', 'Unknown error'))
+            return None
+        
+        logger.info("historical_fetch_completed", exchange=exchange, scripcode=scripcode,
+                    interval=interval, points=len(buffers), sample=LOG_SAMPLE_RATE)
+        return _frame_from_columns(*buffers.to_arrays())
+    
+    def _historical_request_args(self, exchange, scripcode, interval, days_back, from_date,
+                                 to_date):
+        """
+        Endpoint URL and query parameters for a historical request
+        """
         # Build the endpoint URL
         endpoint_url = f"{self.base_url}/historical/{exchange}/{scripcode}/{interval}"
         
@@ -84,26 +344,66 @@ class SharekhanDirectAPI:
             "toDate": to_date
         }
         
-        print(f"Fetching data from: {endpoint_url}")
-        print(f"Date range: {from_date} to {to_date}")
+        logger.debug("historical_fetch_started", url=endpoint_url, from_date=from_date, to_date=to_date)
+        return endpoint_url, params
+    
+    def iter_historical_chunks(self, exchange="MCX", scripcode="GOLDM", interval="5H",
+                               days_back=30, from_date=None, to_date=None,
+                               max_workers=MAX_FETCH_WORKERS):
+        """
+        Fetch a long date range as interval-sized windows in parallel
         
-        try:
-            response = self.session.get(endpoint_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if data.get('status') == 'success':
-                historical_data = data.get('data', [])
-                print(f"✓ Fetched {len(historical_data)} data points")
-                return historical_data
+        Each window is retried on its own (by _request), and (window, raw_data)
+        pairs are yielded as soon as each window finishes. raw_data is None for a
+        window that still failed after all retries.
+        """
+        if not from_date or not to_date:
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days_back)
+            from_date = start_date.strftime("%Y-%m-%d")
+            to_date = end_date.strftime("%Y-%m-%d")
+        
+        windows = split_date_range(from_date, to_date, interval)
+        if len(windows) > 1:
+            logger.info("historical_range_split", from_date=from_date, to_date=to_date,
+                        chunks=len(windows))
+        
+        fetch_requests = {
+            window: {
+                "exchange": exchange,
+                "scripcode": scripcode,
+                "interval": interval,
+                "from_date": window[0],
+                "to_date": window[1]
+            }
+            for window in windows
+        }
+        yield from fetch_concurrently(self, fetch_requests, max_workers=max_workers)
+    
+    def get_historical_data_chunked(self, exchange="MCX", scripcode="GOLDM", interval="5H",
+                                    days_back=30, from_date=None, to_date=None,
+                                    allow_partial=False):
+        """
+        Same as get_goldm_historical_data, but fetched in parallel chunks
+        Returns the combined raw records, or None if any chunk failed after its
+        retries (a series with holes would silently skew resampling and stats).
+        With allow_partial=True the records of the chunks that succeeded are
+        returned instead, and None only if every chunk failed.
+        """
+        all_records = []
+        failed = []
+        for window, raw_data in self.iter_historical_chunks(exchange, scripcode, interval,
+                                                            days_back, from_date, to_date):
+            if raw_data is None:
+                failed.append(window)
             else:
-                print(f"✗ API Error: {data.get('message', 'Unknown error')}")
+                all_records.extend(raw_data)
+        
+        if failed:
+            logger.warning("historical_chunks_failed", count=len(failed), windows=sorted(failed))
+            if not allow_partial or not all_records:
                 return None
-                
-        except requests.exceptions.RequestException as e:
-            print(f"✗ Request error: {e}")
-            return None
+        return all_records
     
     def logout(self):
         """
@@ -112,45 +412,141 @@ class SharekhanDirectAPI:
         if self.auth_token:
             logout_url = f"{self.base_url}/auth/logout"
             try:
-                response = self.session.post(logout_url)
+                response = self._request("POST", logout_url, "auth/logout")
                 if response.status_code == 200:
-                    print("✓ Logged out successfully")
+                    logger.info("logout_successful")
                 else:
-                    print("⚠ Logout response:", response.status_code)
+                    logger.warning("logout_response", status=response.status_code)
             except:
-                print("⚠ Logout request failed (continuing anyway)")
+                logger.warning("logout_failed", hint="continuing anyway")
             
             self.auth_token = None
             self.session.headers.pop('Authorization', None)
+        
+        with self._hedge_lock:
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+                self._hedge_executor = None
+
+def _close_response(future):
+    try:
+        future.result().close()
+    except Exception:
+        pass
+
+def _retry_after_seconds(response):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date), 0 if absent
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return 0
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0
+    return max((retry_at - datetime.now(retry_at.tzinfo)).total_seconds(), 0)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter shared by concurrent fetches
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Block until the requested number of tokens is available
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, tokens=1):
+        """
+        Take the tokens if they are available right now; never blocks
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+_historical_bucket = TokenBucket(HISTORICAL_RATE_LIMIT, HISTORICAL_BURST)
+
+def split_date_range(from_date, to_date, interval):
+    """
+    Split an inclusive YYYY-MM-DD date range into windows sized for the interval
+    Returns a list of (from_date, to_date) string tuples
+    """
+    chunk_days = CHUNK_DAYS.get(interval, DEFAULT_CHUNK_DAYS)
+    start = datetime.strptime(from_date, "%Y-%m-%d")
+    end = datetime.strptime(to_date, "%Y-%m-%d")
+    
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=chunk_days - 1), end)
+        windows.append((start.strftime("%Y-%m-%d"), window_end.strftime("%Y-%m-%d")))
+        start = window_end + timedelta(days=1)
+    return windows
+
+def fetch_concurrently(api, fetch_requests, max_workers=MAX_FETCH_WORKERS):
+    """
+    Run get_goldm_historical_data calls in parallel
+    
+    Throttling and retries happen per upstream attempt inside the client (see
+    SharekhanDirectAPI._request), so all threads share the api's token bucket.
+    
+    Parameters:
+    - api: Logged-in SharekhanDirectAPI instance
+    - fetch_requests: Dict of key -> keyword arguments for get_goldm_historical_data
+    - max_workers: Maximum number of requests in flight
+    
+    Yields (key, raw_data) as each request finishes, in completion order
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(api.get_goldm_historical_data, **kwargs): key
+                   for key, kwargs in fetch_requests.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                yield key, future.result()
+            except Exception as e:
+                logger.error("fetch_failed", key=str(key), error=str(e))
+                yield key, None
 
+@timed_stage("process")
 def process_goldm_data(raw_data):
     """
     Process raw GOLDM data from Sharekhan API into pandas DataFrame
     """
     if not raw_data:
-        print("No data to process")
+        logger.warning("no_data_to_process")
         return None
     
     try:
         df = pd.DataFrame(raw_data)
         
-        # Map API response fields to standard OHLCV format
-        # Adjust these field names based on actual API response structure
-        field_mapping = {
-            'timestamp': 'datetime',
-            'dateTime': 'datetime',
-            'time': 'datetime',
-            'open': 'open',
-            'high': 'high',
-            'low': 'low',
-            'close': 'close',
-            'ltp': 'close',  # Last traded price as close
-            'volume': 'volume',
-            'vol': 'volume'
-        }
-        
         # Rename columns based on mapping
-        for old_name, new_name in field_mapping.items():
+        for old_name, new_name in FIELD_MAPPING.items():
             if old_name in df.columns:
                 df = df.rename(columns={old_name: new_name})
         
@@ -160,23 +556,146 @@ def process_goldm_data(raw_data):
             df = df.set_index('datetime')
         
         # Ensure OHLCV columns are numeric
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-        for col in numeric_cols:
+        for col in NUMERIC_COLUMNS:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        # Sort by datetime
-        df = df.sort_index()
+        return sort_and_dedupe(df)
         
-        # Remove any duplicate timestamps
-        df = df[~df.index.duplicated(keep='last')]
+    except Exception as e:
+        logger.error("process_failed", error=str(e))
+        return None
+
+def _numeric_column(values, downcast):
+    """
+    Convert a list of raw values to a numeric (or downcast) array in one step
+    """
+    try:
+        column = np.asarray(values)
+        if column.dtype.kind not in 'iuf':
+            column = column.astype(np.float64)
+    except (TypeError, ValueError):
+        # Unparseable values - fall back to the lenient pandas conversion
+        column = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+    
+    if downcast:
+        column = column.astype(np.float32)
+    return column
+
+def _volume_column(values, downcast):
+    column = _numeric_column(values, downcast=False)
+    if not downcast:
+        return column
+    
+    # Whole-number volumes that fit use int32, anything else float32
+    limits = np.iinfo(np.int32)
+    if column.size and np.isfinite(column).all() and (column == np.round(column)).all() \
+            and limits.min <= column.min() and column.max() <= limits.max:
+        return column.astype(np.int32)
+    return column.astype(np.float32)
+
+@timed_stage("process")
+def normalize_goldm_records(raw_data, downcast=False):
+    """
+    Low-allocation alternative to process_goldm_data
+    
+    Builds each typed column straight from the raw records instead of creating an
+    object DataFrame and renaming/converting it step by step. The sort is skipped
+    when the input is already in time order, and duplicates are only filtered when
+    present. Set downcast=True to store prices as float32 and volume as int32.
+    """
+    if not raw_data:
+        logger.warning("no_data_to_process")
+        return None
+    
+    try:
+        # Resolve which source field feeds each output column from the union of all
+        # records' fields (in first-seen order), so a field missing from the first
+        # record is still kept; records without it get a missing value
+        sources = {}
+        seen = set()
+        for record in raw_data:
+            if seen.issuperset(record):
+                continue
+            for field in record:
+                if field not in seen:
+                    seen.add(field)
+                    name = FIELD_MAPPING.get(field, field)
+                    if name not in sources:
+                        sources[name] = field
+        
+        columns = {}
+        index = None
+        for name, field in sources.items():
+            values = [record.get(field) for record in raw_data]
+            if name == 'datetime':
+                index = pd.DatetimeIndex(pd.to_datetime(values), name='datetime')
+            elif name == 'volume':
+                columns[name] = _volume_column(values, downcast)
+            elif name in NUMERIC_COLUMNS:
+                columns[name] = _numeric_column(values, downcast)
+            else:
+                columns[name] = np.array(values, dtype=object)
+            del values
         
-        return df
+        return _frame_from_columns(index, columns)
         
     except Exception as e:
-        print(f"Error processing data: {e}")
+        logger.error("process_failed", error=str(e))
         return None
 
+def _frame_from_columns(index, columns):
+    """
+    Build a time-ordered, de-duplicated frame from typed columns without copying
+    when the input is already in order
+    """
+    if index is not None:
+        index = pd.DatetimeIndex(index, name='datetime')
+        order = None
+        if not index.is_monotonic_increasing:
+            order = np.argsort(index.asi8, kind='stable')
+            index = index.take(order)
+        if index.has_duplicates:
+            keep = ~index.duplicated(keep='last')
+            order = np.flatnonzero(keep) if order is None else order[keep]
+            index = index[keep]
+        if order is not None:
+            columns = {name: column[order] for name, column in columns.items()}
+    
+    return pd.DataFrame(columns, index=index, copy=False)
+
+def process_chunked_history(chunks):
+    """
+    Process (window, raw_data) chunks as they arrive and combine them into one DataFrame
+    Returns (df or None, sorted list of windows that failed after all retries)
+    """
+    frames = []
+    failed = []
+    for window, raw_data in chunks:
+        if raw_data is None:
+            failed.append(window)
+            continue
+        df = process_goldm_data(raw_data) if raw_data else None
+        if df is not None and not df.empty:
+            frames.append(df)
+    
+    failed.sort()
+    if not frames:
+        return None, failed
+    return sort_and_dedupe(pd.concat(frames)), failed
+
+def sort_and_dedupe(df):
+    """
+    Sort bars by datetime and drop duplicate timestamps, keeping the latest row
+    """
+    # Sort by datetime
+    df = df.sort_index(kind='mergesort')  # stable, so keep='last' keeps the newest row
+    
+    # Remove any duplicate timestamps
+    df = df[~df.index.duplicated(keep='last')]
+    
+    return df
+
 def get_goldm_scrip_codes():
     """
     Common GOLDM scrip codes for different expiries
@@ -188,72 +707,216 @@ def get_goldm_scrip_codes():
         'GOLDM_FAR': 'GOLDM2'     # Far month
     }
 
-def analyze_goldm_data(df):
+def _column_values(frames, column, fallback=None):
     """
-    Analyze GOLDM 5-hour data and provide insights
+    Concatenate one column of every frame into a single float64 array
+    (NaN-filled for frames that do not have the column)
     """
-    if df is None or df.empty:
-        return {"error": "No data to analyze"}
+    parts = []
+    for df in frames:
+        name = column if column in df.columns else fallback
+        if name in df.columns:
+            parts.append(df[name].to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            parts.append(np.full(len(df), np.nan))
+    return np.concatenate(parts)
+
+def _segment_reduce(values, starts, lengths):
+    """
+    NaN-aware per-segment count/sum/mean/max/min/std (ddof=1) using reduceat
+    """
+    valid = ~np.isnan(values)
+    count = np.add.reduceat(valid, starts, dtype=np.int64)
+    total = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        deviation = np.where(valid, values - np.repeat(mean, lengths), 0.0)
+        std = np.sqrt(np.add.reduceat(deviation * deviation, starts) / (count - 1))
+        std[count < 2] = np.nan
+        high = np.fmax.reduceat(values, starts)
+        low = np.fmin.reduceat(values, starts)
+    return count, total, mean, high, low, std
+
+def compute_ohlcv_stats(frames):
+    """
+    Compute numeric summary statistics for one or many OHLCV frames
+    
+    All frames are concatenated once per column and every statistic is a single
+    vectorized reduceat pass over NumPy arrays; the input frames are not modified.
+    
+    Accepts a DataFrame, a list of DataFrames or a dict of name -> DataFrame and
+    returns a stats dict, a list of stats dicts or a dict of name -> stats dict.
+    Use format_analysis() to turn a stats dict into display strings.
+    """
+    if isinstance(frames, pd.DataFrame):
+        return compute_ohlcv_stats([frames])[0]
+    if isinstance(frames, dict):
+        return dict(zip(frames.keys(), compute_ohlcv_stats(list(frames.values()))))
     
-    analysis = {}
+    results = [{"error": "No data to analyze"} for _ in frames]
+    present = [i for i, df in enumerate(frames) if df is not None and not df.empty]
+    if not present:
+        return results
     
-    # Basic data info
-    analysis['data_summary'] = {
-        'total_periods': len(df),
-        'date_range': {
-            'start': df.index.min().strftime('%Y-%m-%d %H:%M'),
-            'end': df.index.max().strftime('%Y-%m-%d %H:%M')
+    valid_frames = [frames[i] for i in present]
+    lengths = np.array([len(df) for df in valid_frames])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    ends = starts + lengths - 1
+    
+    has_close = [('close' in df.columns) for df in valid_frames]
+    has_volume = [('volume' in df.columns) for df in valid_frames]
+    
+    if any(has_close):
+        close = _column_values(valid_frames, 'close')
+        high = _column_values(valid_frames, 'high', fallback='close')
+        low = _column_values(valid_frames, 'low', fallback='close')
+        _, _, close_mean, _, _, _ = _segment_reduce(close, starts, lengths)
+        high_max = _segment_reduce(high, starts, lengths)[3]
+        low_min = _segment_reduce(low, starts, lengths)[4]
+        
+        # Period returns, with the first bar of every frame masked out
+        returns = np.empty_like(close)
+        returns[0] = np.nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns[1:] = close[1:] / close[:-1] - 1
+        returns[starts] = np.nan
+        _, _, _, ret_max, ret_min, ret_std = _segment_reduce(returns, starts, lengths)
+        
+        first_close = close[starts]
+        last_close = close[ends]
+    
+    if any(has_volume):
+        volume = _column_values(valid_frames, 'volume')
+        _, volume_sum, volume_mean, volume_max, _, _ = _segment_reduce(volume, starts, lengths)
+        last_volume = volume[ends]
+    
+    for k, (i, df) in enumerate(zip(present, valid_frames)):
+        stats = {
+            'data_summary': {
+                'total_periods': int(lengths[k]),
+                'date_range': {
+                    'start': df.index.min(),
+                    'end': df.index.max()
+                }
+            }
+        }
+        
+        if has_close[k]:
+            stats['price_analysis'] = {
+                'current_price': float(last_close[k]),
+                'highest_price': float(high_max[k]),
+                'lowest_price': float(low_min[k]),
+                'average_price': float(close_mean[k]),
+                'price_change': float(last_close[k] - first_close[k]),
+                'price_change_pct': float(last_close[k] / first_close[k] - 1)
+            }
+            stats['volatility'] = {
+                'std_deviation': float(ret_std[k]),
+                'max_gain': float(ret_max[k]),
+                'max_loss': float(ret_min[k])
+            }
+        
+        if has_volume[k]:
+            stats['volume_analysis'] = {
+                'total_volume': float(volume_sum[k]),
+                'average_volume': float(volume_mean[k]),
+                'highest_volume': float(volume_max[k]),
+                'latest_volume': float(last_volume[k])
+            }
+        
+        results[i] = stats
+    
+    return results
+
+def format_analysis(stats):
+    """
+    Format a compute_ohlcv_stats() result for display
+    """
+    if 'error' in stats:
+        return stats
+    
+    summary = stats['data_summary']
+    analysis = {
+        'data_summary': {
+            'total_periods': summary['total_periods'],
+            'date_range': {
+                'start': summary['date_range']['start'].strftime('%Y-%m-%d %H:%M'),
+                'end': summary['date_range']['end'].strftime('%Y-%m-%d %H:%M')
+            }
         }
     }
     
-    # Price analysis
-    if 'close' in df.columns:
-        latest_price = df['close'].iloc[-1]
+    if 'price_analysis' in stats:
+        price = stats['price_analysis']
         analysis['price_analysis'] = {
-            'current_price': f"₹{latest_price:,.2f}",
-            'highest_price': f"₹{df['high'].max():,.2f}",
-            'lowest_price': f"₹{df['low'].min():,.2f}",
-            'average_price': f"₹{df['close'].mean():,.2f}",
-            'price_change': f"₹{(df['close'].iloc[-1] - df['close'].iloc[0]):,.2f}",
-            'price_change_pct': f"{((df['close'].iloc[-1] / df['close'].iloc[0]) - 1) * 100:.2f}%"
+            'current_price': f"₹{price['current_price']:,.2f}",
+            'highest_price': f"₹{price['highest_price']:,.2f}",
+            'lowest_price': f"₹{price['lowest_price']:,.2f}",
+            'average_price': f"₹{price['average_price']:,.2f}",
+            'price_change': f"₹{price['price_change']:,.2f}",
+            'price_change_pct': f"{price['price_change_pct'] * 100:.2f}%"
         }
         
-        # Volatility analysis
-        df['price_change'] = df['close'].pct_change()
+        volatility = stats['volatility']
         analysis['volatility'] = {
-            'std_deviation': f"{df['price_change'].std() * 100:.2f}%",
-            'max_gain': f"{df['price_change'].max() * 100:.2f}%",
-            'max_loss': f"{df['price_change'].min() * 100:.2f}%"
+            'std_deviation': f"{volatility['std_deviation'] * 100:.2f}%",
+            'max_gain': f"{volatility['max_gain'] * 100:.2f}%",
+            'max_loss': f"{volatility['max_loss'] * 100:.2f}%"
         }
     
-    # Volume analysis
-    if 'volume' in df.columns:
+    if 'volume_analysis' in stats:
+        volume = stats['volume_analysis']
         analysis['volume_analysis'] = {
-            'total_volume': f"{df['volume'].sum():,.0f}",
-            'average_volume': f"{df['volume'].mean():,.0f}",
-            'highest_volume': f"{df['volume'].max():,.0f}",
-            'latest_volume': f"{df['volume'].iloc[-1]:,.0f}"
+            'total_volume': f"{volume['total_volume']:,.0f}",
+            'average_volume': f"{volume['average_volume']:,.0f}",
+            'highest_volume': f"{volume['highest_volume']:,.0f}",
+            'latest_volume': f"{volume['latest_volume']:,.0f}"
         }
     
     return analysis
 
-def save_data_with_timestamp(df, base_filename="goldm_5hr_data"):
+@timed_stage("analyze")
+def analyze_goldm_data(df):
+    """
+    Analyze GOLDM 5-hour data and provide insights (does not modify df)
+    """
+    if df is None or df.empty:
+        return {"error": "No data to analyze"}
+    
+    return format_analysis(compute_ohlcv_stats(df))
+
+@timed_stage("save")
+def save_data_with_timestamp(df, base_filename="goldm_5hr_data", file_format="csv"):
     """
     Save data with timestamp in filename
+    
+    file_format="columnar" instead appends to a memory-mappable columnar store
+    at {base_filename}.cols (see columnar.py), which is reused across runs.
     """
     if df is None or df.empty:
-        print("No data to save")
+        logger.warning("no_data_to_save")
         return
     
+    if file_format == "columnar":
+        path = f"{base_filename}.cols"
+        try:
+            from columnar import save_columnar
+            rows = save_columnar(df, path)
+            logger.info("data_saved", path=path, rows=rows)
+            return path
+        except Exception as e:
+            logger.error("save_failed", path=path, error=str(e))
+            return None
+    
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{base_filename}_{timestamp}.csv"
     
     try:
         df.to_csv(filename)
-        print(f"✓ Data saved to {filename}")
+        logger.info("data_saved", path=filename, rows=len(df))
         return filename
     except Exception as e:
-        print(f"✗ Error saving data: {e}")
+        logger.error("save_failed", path=filename, error=str(e))
         return None
 
 def main():
@@ -319,33 +982,50 @@ def main():
         api.logout()
 
 # Alternative function for different intervals
-def fetch_multiple_intervals(api, intervals=['1H', '5H', '1D']):
+def fetch_multiple_intervals(api, intervals=['1H', '5H', '1D'], days_back=30, resample_locally=True):
     """
     Fetch GOLDM data for multiple time intervals
+    
+    With resample_locally=True (default) only the finest interval is fetched and the
+    others are built from it with resample_ohlcv (MCX session aligned), so N intervals
+    cost one upstream call. Otherwise every interval is fetched concurrently.
     """
+    from resample import choose_base_interval, resample_ohlcv
+
     all_data = {}
     
-    for interval in intervals:
-        print(f"\nFetching {interval} data...")
-        raw_data = api.get_goldm_historical_data(
-            interval=interval,
-            days_back=30
-        )
+    base_interval = choose_base_interval(intervals) if resample_locally else None
+    if base_interval:
+        print(f"\nFetching {base_interval} data and resampling to {', '.join(intervals)}...")
+        raw_data = api.get_historical_data_chunked(interval=base_interval, days_back=days_back)
+        base_df = process_goldm_data(raw_data) if raw_data else None
+        if base_df is None or base_df.empty:
+            return all_data
         
+        for interval in intervals:
+            df = base_df if interval == base_interval else resample_ohlcv(base_df, interval)
+            all_data[interval] = df
+            print(f"✓ {interval}: {len(df)} data points")
+        return all_data
+    
+    fetch_requests = {
+        interval: {"interval": interval, "days_back": days_back}
+        for interval in intervals
+    }
+    
+    for interval, raw_data in fetch_concurrently(api, fetch_requests):
         if raw_data:
             df = process_goldm_data(raw_data)
             if df is not None and not df.empty:
                 all_data[interval] = df
                 print(f"✓ {interval}: {len(df)} data points")
-        
-        time.sleep(1)  # Rate limiting
     
     return all_data
 
 # Example usage for specific contract months
 def fetch_goldm_contracts():
     """
-    Fetch data for different GOLDM contract months
+    Fetch data for different GOLDM contract months concurrently
     """
     contracts = get_goldm_scrip_codes()
     api = SharekhanDirectAPI(
@@ -356,27 +1036,23 @@ def fetch_goldm_contracts():
     
     if api.login():
         contract_data = {}
+        fetch_requests = {
+            contract_name: {"scripcode": scrip_code, "interval": "5H", "days_back": 30}
+            for contract_name, scrip_code in contracts.items()
+        }
         
-        for contract_name, scrip_code in contracts.items():
-            print(f"\nFetching {contract_name} ({scrip_code})...")
-            
-            raw_data = api.get_goldm_historical_data(
-                scripcode=scrip_code,
-                interval="5H",
-                days_back=30
-            )
-            
+        for contract_name, raw_data in fetch_concurrently(api, fetch_requests):
             if raw_data:
                 df = process_goldm_data(raw_data)
                 if df is not None and not df.empty:
                     contract_data[contract_name] = df
-            
-            time.sleep(1)  # Rate limiting
+                    print(f"✓ {contract_name}: {len(df)} data points")
         
         api.logout()
         return contract_data
 
 if __name__ == "__main__":
+    setup_logging()
     print("⚠️  Please replace API credentials with your actual Sharekhan API details")
     print("⚠️  Uncomment main() call below to execute\n")
     
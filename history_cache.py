@@ -0,0 +1,338 @@
+# Warm in-memory cache of processed historical bars for the app's /history endpoint
+# Each entry holds the serialized JSON body and its ETag. A background task started
+# from the app lifespan refreshes configured and popular series on a schedule, so
+# reads are answered from memory instead of every caller hitting the broker.
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from structured_logging import LOG_SAMPLE_RATE, get_logger
+
+
+logger = get_logger("history_cache")
+
+
+class HistoryUnavailable(Exception):
+    """
+    Upstream returned no data for a series and there is nothing cached to fall back on
+    """
+
+
+class HistoryBusy(HistoryUnavailable):
+    """
+    Too many series are already being fetched; the caller should retry later
+    """
+
+
+class HistoryEntry:
+    __slots__ = ('body', 'etag', 'bars', 'fetched_at')
+
+    def __init__(self, body, bars):
+        self.body = body
+        # Derived from the content only, so an unchanged series keeps its ETag across refreshes
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.bars = bars
+        self.fetched_at = time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.fetched_at
+
+
+def parse_series(spec, default_days_back=30):
+    """
+    Parse "EXCHANGE:SCRIPCODE:INTERVAL[:DAYS_BACK]" into a cache key
+    """
+    parts = spec.strip().split(":")
+    if len(parts) not in (3, 4) or not all(parts):
+        raise ValueError(f"Expected EXCHANGE:SCRIPCODE:INTERVAL[:DAYS_BACK], got {spec!r}")
+    days_back = int(parts[3]) if len(parts) == 4 else default_days_back
+    return (parts[0].upper(), parts[1], parts[2], days_back)
+
+
+def serialize_bars(df, exchange, scripcode, interval):
+    """
+    JSON body for a processed frame: series metadata plus one record per bar
+    """
+    records = df.reset_index().to_json(orient="records", date_format="iso", date_unit="s")
+    header = json.dumps({"status": "success", "exchange": exchange, "scripcode": scripcode,
+                         "interval": interval, "bars": len(df)})
+    return f'{header[:-1]}, "data": {records}}}'.encode('utf-8')
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Weak comparison of an If-None-Match header against etag (RFC 9110)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class SharekhanHistorySource:
+    """
+    Blocking fetch(exchange, scripcode, interval, days_back) -> DataFrame backed by one
+    logged-in SharekhanDirectAPI, shared by the cache's worker threads
+
+    Series are fetched through the chunked path (iter_historical_chunks +
+    process_chunked_history), so long ranges are split into interval-sized windows
+    and every request takes a token from the process-wide historical rate limit.
+    A series with a failed window is reported as unavailable rather than cached with
+    a hole.
+
+    Logs in again only when the API rejected the session token (401). Failed logins
+    back off exponentially (login_backoff doubling up to max_login_backoff seconds),
+    so clients requesting series cannot drive a stream of upstream logins.
+    """
+
+    def __init__(self, api_key, secret_key, user_id, base_url, login_backoff=5.0,
+                 max_login_backoff=300.0, **api_options):
+        self.credentials = dict(api_key=api_key, secret_key=secret_key, user_id=user_id,
+                                base_url=base_url, **api_options)
+        self.login_backoff = login_backoff
+        self.max_login_backoff = max_login_backoff
+        self.api = None
+        self.login_failures = 0
+        self._next_login = 0.0
+        self._login_lock = threading.Lock()
+
+    def _logged_in_api(self):
+        with self._login_lock:
+            if self.api is None:
+                # Imported here so the app only loads the data client once history is used
+                from fetch_data import SharekhanDirectAPI
+                self.api = SharekhanDirectAPI(**self.credentials)
+            if self.api.auth_token:
+                return self.api
+
+            wait = self._next_login - time.monotonic()
+            if wait > 0:
+                raise HistoryUnavailable(f"Sharekhan login failed; next attempt in {wait:.0f}s")
+            if not self.api.login():
+                self.login_failures += 1
+                backoff = min(self.max_login_backoff,
+                              self.login_backoff * 2 ** (self.login_failures - 1))
+                self._next_login = time.monotonic() + backoff
+                raise HistoryUnavailable("Sharekhan login failed")
+            self.login_failures = 0
+            return self.api
+
+    def _fetch(self, api, exchange, scripcode, interval, days_back):
+        from fetch_data import process_chunked_history
+        return process_chunked_history(api.iter_historical_chunks(
+            exchange=exchange, scripcode=scripcode, interval=interval, days_back=days_back
+        ))
+
+    def __call__(self, exchange, scripcode, interval, days_back):
+        api = self._logged_in_api()
+        df, failed = self._fetch(api, exchange, scripcode, interval, days_back)
+        if failed and not api.auth_token:
+            # The session token was rejected (401); log in again and retry once
+            df, failed = self._fetch(self._logged_in_api(), exchange, scripcode, interval, days_back)
+        if failed:
+            raise HistoryUnavailable(f"{len(failed)} window(s) of {exchange}:{scripcode} {interval} "
+                                     f"failed upstream")
+        return df
+
+    def close(self):
+        if self.api is not None:
+            self.api.session.close()
+
+
+class HistoryCache:
+    """
+    Serialized historical series keyed by (exchange, scripcode, interval, days_back)
+
+    Entries younger than ttl are served as they are. Older or missing ones are fetched
+    (one upstream call per key however many requests wait on it) and, if that fails, a
+    stale entry is served rather than an error. run() refreshes warm_series and the
+    popular_count most requested series every refresh_interval seconds; request counts
+    are halved every cycle so popularity follows recent traffic.
+
+    Fetches run on the cache's own pool of max_fetch_workers threads (they sleep on the
+    upstream rate limit, so they must not occupy the loop's default executor), and at
+    most max_pending_fetches series can be waiting for one; beyond that requests get
+    HistoryBusy. A failed series with nothing cached is answered from a negative cache
+    for failure_ttl seconds instead of hitting upstream again, and at most max_tracked
+    series are counted for popularity.
+    """
+
+    def __init__(self, fetch, ttl=300, refresh_interval=60, max_entries=256, popular_count=20,
+                 warm_series=(), max_fetch_workers=2, max_pending_fetches=16, failure_ttl=30,
+                 max_tracked=1024):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.max_entries = max_entries
+        self.popular_count = popular_count
+        self.warm_series = list(warm_series)
+        self.max_pending_fetches = max_pending_fetches
+        self.failure_ttl = failure_ttl
+        self.max_tracked = max_tracked
+        self._executor = ThreadPoolExecutor(max_workers=max_fetch_workers,
+                                            thread_name_prefix="history-fetch")
+        self._entries = OrderedDict()  # key -> HistoryEntry
+        self._inflight = {}  # key -> asyncio.Task
+        self._requests = {}  # key -> decayed request count
+        self._failures = OrderedDict()  # key -> (failed_at, error message)
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.busy_rejections = 0
+        self.stale_served = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+
+    def _recent_failure(self, key):
+        failure = self._failures.get(key)
+        if failure is not None and time.monotonic() - failure[0] >= self.failure_ttl:
+            del self._failures[key]
+            return None
+        return failure
+
+    def _track(self, key):
+        if key in self._requests or len(self._requests) < self.max_tracked:
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    async def get(self, key):
+        """
+        Return a HistoryEntry for key; raises HistoryUnavailable (or the fetch error)
+        when there is no data and nothing cached
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.age() < self.ttl:
+            self._track(key)
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        failure = self._recent_failure(key) if entry is None else None
+        if failure is not None:
+            self.negative_hits += 1
+            raise HistoryUnavailable(failure[1])
+
+        self._track(key)
+        self.misses += 1
+        try:
+            return await self.refresh(key)
+        except Exception as e:
+            if entry is None:
+                raise
+            self.stale_served += 1
+            logger.warning("history_serving_stale", series=":".join(map(str, key)),
+                           age=round(entry.age(), 1), error=str(e))
+            return entry
+
+    async def refresh(self, key):
+        """
+        Fetch key from upstream and replace its entry; concurrent calls share one fetch
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            if len(self._inflight) >= self.max_pending_fetches:
+                self.busy_rejections += 1
+                raise HistoryBusy("Too many historical series are being fetched; retry shortly")
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return await asyncio.shield(task)
+
+    def _fetch_done(self, key, task):
+        self._inflight.pop(key, None)
+        # Retrieve the exception so a fetch nobody awaits any more is not reported as lost
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, key):
+        started = time.perf_counter()
+        try:
+            body, bars = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._load, key)
+        except Exception as e:
+            self.refresh_failures += 1
+            self._failures[key] = (time.monotonic(), str(e))
+            self._failures.move_to_end(key)
+            while len(self._failures) > self.max_tracked:
+                self._failures.popitem(last=False)
+            logger.error("history_refresh_failed", series=":".join(map(str, key)), error=str(e))
+            raise
+
+        self._failures.pop(key, None)
+
+        entry = HistoryEntry(body, bars)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._requests.pop(evicted, None)
+            self.evictions += 1
+        self.refreshes += 1
+        logger.info("history_refreshed", series=":".join(map(str, key)), bars=bars,
+                    bytes=len(body), seconds=round(time.perf_counter() - started, 3),
+                    sample=LOG_SAMPLE_RATE)
+        return entry
+
+    def _load(self, key):
+        # Runs in a worker thread: the blocking fetch and the serialization
+        exchange, scripcode, interval, days_back = key
+        df = self.fetch(exchange, scripcode, interval, days_back)
+        if df is None:
+            raise HistoryUnavailable(f"No data from upstream for {exchange}:{scripcode} {interval}")
+        return serialize_bars(df, exchange, scripcode, interval), len(df)
+
+    def popular(self):
+        # Series that just failed are left to the negative cache instead of being refetched
+        ranked = [key for key in sorted(self._requests, key=self._requests.get, reverse=True)
+                  if self._recent_failure(key) is None]
+        return list(dict.fromkeys([*self.warm_series, *ranked[:self.popular_count]]))
+
+    async def refresh_popular(self):
+        """
+        One refresh cycle: refetch warm and popular series (one at a time, to stay
+        within the upstream rate limit), skipping ones fetched within the last half cycle
+        """
+        for key in self.popular():
+            entry = self._entries.get(key)
+            if entry is not None and entry.age() < self.refresh_interval / 2:
+                continue
+            try:
+                await self.refresh(key)
+            except Exception:
+                pass  # logged in _fetch; the stale entry keeps being served
+        self._requests = {key: count / 2 for key, count in self._requests.items() if count >= 2}
+
+    async def run(self):
+        """
+        Background refresh loop for the app lifespan (cancel it on shutdown)
+        """
+        while True:
+            await self.refresh_popular()
+            await asyncio.sleep(self.refresh_interval)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "tracked_series": len(self._requests),
+            "failed_series": len(self._failures),
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "busy_rejections": self.busy_rejections,
+            "stale_served": self.stale_served,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,30 @@
+# Deferred imports for heavy optional-at-startup dependencies (pandas, numpy)
+# Modules that only need them inside functions bind a LazyModule at import time;
+# the real import happens on first attribute access.
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported the first time an attribute is used
+    """
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # Copy the real namespace over so later lookups are plain attribute hits
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_module(name):
+    """
+    Return the module if it is already imported, otherwise a LazyModule for it
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
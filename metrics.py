@@ -0,0 +1,266 @@
+# Lightweight in-process metrics shared by the token app and the data client
+# Counters, gauges and histograms with labels, rendered in the Prometheus text
+# format by the /metrics endpoint. No external dependencies.
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _TallyCounter
+from contextlib import contextmanager
+from functools import wraps
+
+
+# Latency buckets in seconds (covers sub-millisecond CPU work up to slow upstream calls)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {value}" for key, value in values]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self._values = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """
+        Count the enclosed block as in flight
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {value}" for key, value in values]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+        self._series = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[position] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the enclosed block; labels can be updated inside it
+        """
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        lines = self.header()
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            return metric
+
+    def counter(self, name, documentation):
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name, documentation):
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def add_collector(self, collector):
+        """
+        Register a callable run before every render (used to refresh gauges lazily)
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        for collector in list(self._collectors):
+            collector()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Shared metric families
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to the Sharekhan API by endpoint and outcome")
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    "upstream_requests_in_flight", "Sharekhan API calls currently in flight")
+PIPELINE_STAGE_LATENCY = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each fetch/process/analyze/save stage")
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Record how long a pipeline stage (fetch, process, analyze, save) takes
+    """
+    with PIPELINE_STAGE_LATENCY.time(stage=stage):
+        yield
+
+
+def timed_stage(stage):
+    """
+    Decorator form of stage_timer
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ----------------------------- Sampling Profiler -----------------------------
+
+class SamplingProfiler:
+    """
+    Periodically samples the stack of one thread and counts collapsed stacks
+    (flamegraph.pl / speedscope "collapsed" format). Only for opt-in debugging.
+    With all_threads=True every other thread is sampled too, each stack rooted at
+    its thread's name.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005, max_depth=64, all_threads=False):
+        self.thread_id = thread_id or threading.get_ident()
+        self.all_threads = all_threads
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = _TallyCounter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if not self.all_threads:
+                self._record(frames.get(self.thread_id))
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id != own_id:
+                    self._record(frame, names.get(thread_id, str(thread_id)))
+
+    def _record(self, frame, root=None):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        if stack:
+            if root is not None:
+                stack.append(root)
+            self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
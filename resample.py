@@ -0,0 +1,135 @@
+# Local OHLCV resampling aligned to MCX trading sessions
+# Builds higher-interval bars (e.g. 5H, 1D) from one finer series so a
+# multi-interval request only needs a single upstream call.
+
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# MCX sessions open at 09:00 IST; intraday bars are counted from the open
+# (5H bars start at 09:00, 14:00 and 19:00), not from midnight
+MCX_SESSION_START = "09:00"
+
+# How each OHLCV column is aggregated into a larger bar
+OHLCV_AGGREGATION = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum'
+}
+
+INTERVAL_UNITS = {'m': 'min', 'min': 'min', 'H': 'h', 'h': 'h', 'D': 'D', 'W': 'W'}
+
+DAY_NS = 86_400 * 1_000_000_000
+
+
+def parse_interval(interval):
+    """
+    Convert an API interval string ('1m', '15m', '1H', '5H', '1D', '1W') to a Timedelta
+    """
+    match = re.fullmatch(r'(\d+)\s*(m|min|H|h|D|W)', str(interval))
+    if not match:
+        raise ValueError(f"Unsupported interval: {interval}")
+    count, unit = match.groups()
+    unit = INTERVAL_UNITS[unit]
+    if unit == 'W':
+        return pd.Timedelta(weeks=int(count))
+    return pd.Timedelta(f"{count}{unit}")
+
+
+def bar_start_labels(index, interval, session_start=MCX_SESSION_START):
+    """
+    Return the start time of the bar each timestamp belongs to
+
+    Intraday bars are anchored to the session start of each day, daily bars to the
+    calendar date and weekly bars to the Monday of the week.
+    """
+    step = parse_interval(interval)
+    index = index.as_unit('ns')
+    day = index.normalize()
+
+    if step == pd.Timedelta(days=1):
+        return day
+    if step == pd.Timedelta(weeks=1):
+        return day - pd.to_timedelta(index.dayofweek, unit='D')
+    if step > pd.Timedelta(days=1):
+        raise ValueError(f"Unsupported interval for resampling: {interval}")
+
+    session_offset = pd.Timedelta(f"{session_start}:00").value
+    elapsed = (index - day).asi8 - session_offset
+    # Anything before the open (pre-open ticks) belongs to the first bar of the session
+    bins = np.maximum(np.floor_divide(elapsed, step.value), 0)
+    return day + pd.to_timedelta(session_offset + bins * step.value, unit='ns')
+
+
+class BarAligner:
+    """
+    Scalar counterpart of bar_start_labels for one interval, on int64 nanoseconds
+
+    Used per tick by the live aggregator, so no pandas objects are created per call.
+    Timestamps are naive exchange-local times, like the API's.
+    """
+
+    def __init__(self, interval, session_start=MCX_SESSION_START):
+        step = parse_interval(interval)
+        if step > pd.Timedelta(days=1) and step != pd.Timedelta(weeks=1):
+            raise ValueError(f"Unsupported interval for resampling: {interval}")
+        self.interval = interval
+        self.step = step.value
+        self.session_offset = pd.Timedelta(f"{session_start}:00").value
+        self.daily = step == pd.Timedelta(days=1)
+        self.weekly = step == pd.Timedelta(weeks=1)
+
+    def start(self, timestamp_ns):
+        day = timestamp_ns - timestamp_ns % DAY_NS
+        if self.daily:
+            return day
+        if self.weekly:
+            # 1970-01-01 was a Thursday (dayofweek 3)
+            return day - ((day // DAY_NS + 3) % 7) * DAY_NS
+        elapsed = timestamp_ns - day - self.session_offset
+        # Anything before the open (pre-open ticks) belongs to the first bar of the session
+        bins = elapsed // self.step if elapsed > 0 else 0
+        return day + self.session_offset + bins * self.step
+
+
+def can_resample(base_interval, target_interval):
+    """
+    True if target bars can be built exactly from base bars
+    """
+    base = parse_interval(base_interval)
+    target = parse_interval(target_interval)
+    if target >= pd.Timedelta(days=1):
+        return base <= pd.Timedelta(days=1) and target % base == pd.Timedelta(0)
+    return target % base == pd.Timedelta(0)
+
+
+def choose_base_interval(intervals):
+    """
+    Pick the finest requested interval if every other one can be built from it,
+    otherwise None
+    """
+    base = min(intervals, key=parse_interval)
+    if all(can_resample(base, interval) for interval in intervals):
+        return base
+    return None
+
+
+def resample_ohlcv(df, interval, session_start=MCX_SESSION_START):
+    """
+    Aggregate an OHLCV frame (DatetimeIndex, bar start times) into larger bars
+
+    open/high/low/close/volume are aggregated as first/max/min/last/sum, other
+    columns keep their last value. Bars are labelled by their start time.
+    """
+    if df is None or df.empty:
+        return df
+
+    labels = bar_start_labels(df.index, interval, session_start)
+    aggregation = {col: OHLCV_AGGREGATION.get(col, 'last') for col in df.columns}
+    bars = df.groupby(labels, sort=True).agg(aggregation)
+    bars.index.name = df.index.name or 'datetime'
+    return bars
@@ -0,0 +1,206 @@
+# Multi-symbol scanner: fetch a universe of instruments concurrently, process and
+# analyze them on all cores, and write one ranked summary table.
+#
+#   python scanner.py universe.example.csv --interval 1D --days-back 90 --rank-by change_pct
+#
+# Credentials come from SHAREKHAN_API_KEY / SHAREKHAN_SECRET_KEY / SHAREKHAN_USER_ID.
+
+import argparse
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from fetch_data import (SharekhanDirectAPI, MAX_FETCH_WORKERS, compute_ohlcv_stats, fetch_concurrently,
+                        process_goldm_data)
+from structured_logging import get_logger, setup_logging
+
+
+logger = get_logger("scanner")
+
+SUMMARY_COLUMNS = [
+    'symbol', 'exchange', 'scripcode', 'status', 'bars', 'start', 'end', 'last_price',
+    'change', 'change_pct', 'high', 'low', 'average_price', 'volatility', 'max_gain',
+    'max_loss', 'total_volume', 'average_volume', 'latest_volume'
+]
+
+
+def load_universe(path, default_exchange="MCX"):
+    """
+    Read a symbol universe file
+
+    CSV with a header containing scripcode and optionally exchange and symbol
+    (display name), or plain text with one EXCHANGE:SCRIPCODE (or SCRIPCODE) per line.
+    Blank lines and lines starting with # are skipped.
+    Returns a list of {'symbol', 'exchange', 'scripcode'} dicts.
+    """
+    with open(path, newline='') as f:
+        lines = [line for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+    universe = []
+    if lines and 'scripcode' in lines[0].lower():
+        for row in csv.DictReader(lines):
+            row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            if not row.get('scripcode'):
+                continue
+            exchange = row.get('exchange') or default_exchange
+            universe.append({
+                'symbol': row.get('symbol') or row['scripcode'],
+                'exchange': exchange,
+                'scripcode': row['scripcode']
+            })
+    else:
+        for line in lines:
+            exchange, _, scripcode = line.strip().rpartition(':')
+            universe.append({
+                'symbol': scripcode,
+                'exchange': exchange or default_exchange,
+                'scripcode': scripcode
+            })
+
+    symbols = [entry['symbol'] for entry in universe]
+    duplicates = {symbol for symbol in symbols if symbols.count(symbol) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate symbols in universe file: {sorted(duplicates)}")
+    return universe
+
+
+def summarize_symbol(entry, raw_data):
+    """
+    Process one symbol's raw records and reduce them to a flat summary row
+    (runs in a worker process, so it must stay a picklable top-level function)
+    """
+    row = dict.fromkeys(SUMMARY_COLUMNS)
+    row.update(entry)
+
+    df = process_goldm_data(raw_data)
+    if df is None or df.empty:
+        row['status'] = 'no_data'
+        return row
+
+    stats = compute_ohlcv_stats(df)
+    summary = stats['data_summary']
+    row.update(status='ok', bars=summary['total_periods'],
+               start=summary['date_range']['start'], end=summary['date_range']['end'])
+
+    price = stats.get('price_analysis')
+    if price:
+        volatility = stats['volatility']
+        row.update(last_price=price['current_price'], change=price['price_change'],
+                   change_pct=price['price_change_pct'], high=price['highest_price'],
+                   low=price['lowest_price'], average_price=price['average_price'],
+                   volatility=volatility['std_deviation'], max_gain=volatility['max_gain'],
+                   max_loss=volatility['max_loss'])
+
+    volume = stats.get('volume_analysis')
+    if volume:
+        row.update(total_volume=volume['total_volume'], average_volume=volume['average_volume'],
+                   latest_volume=volume['latest_volume'])
+    return row
+
+
+def scan(api, universe, interval="1D", days_back=90, max_fetch_workers=MAX_FETCH_WORKERS,
+         processes=None):
+    """
+    Fetch every symbol concurrently (sharing the historical rate limit) and hand each
+    response to a process pool as soon as it arrives, so downloads and the CPU-bound
+    processing overlap. Returns the unranked summary as a DataFrame.
+    """
+    entries = {entry['symbol']: entry for entry in universe}
+    fetch_requests = {
+        symbol: {
+            "exchange": entry['exchange'],
+            "scripcode": entry['scripcode'],
+            "interval": interval,
+            "days_back": days_back
+        }
+        for symbol, entry in entries.items()
+    }
+
+    rows = []
+    futures = []
+    # Workers must not be forked from this process: the fetch threads and the logging
+    # listener may hold locks (metrics, logging) at that moment, which would deadlock the child
+    context = multiprocessing.get_context("forkserver" if "forkserver" in
+                                          multiprocessing.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), mp_context=context) as pool:
+        for symbol, raw_data in fetch_concurrently(api, fetch_requests, max_workers=max_fetch_workers):
+            if raw_data is None:
+                rows.append({**dict.fromkeys(SUMMARY_COLUMNS), **entries[symbol],
+                             'status': 'fetch_failed'})
+                continue
+            futures.append((symbol, pool.submit(summarize_symbol, entries[symbol], raw_data)))
+            del raw_data
+
+        for symbol, future in futures:
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                logger.error("scan_process_failed", symbol=symbol, error=str(e))
+                rows.append({**dict.fromkeys(SUMMARY_COLUMNS), **entries[symbol],
+                             'status': 'process_failed'})
+
+    logger.info("scan_finished", symbols=len(universe),
+                ok=sum(row['status'] == 'ok' for row in rows))
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def rank_summary(summary, rank_by="change_pct", ascending=False):
+    """
+    Sort the summary by rank_by (symbols without a value go last) and add a rank column
+    """
+    if rank_by not in summary.columns:
+        raise ValueError(f"Unknown rank column: {rank_by}")
+    ranked = summary.sort_values(rank_by, ascending=ascending, na_position='last', kind='mergesort')
+    ranked = ranked.reset_index(drop=True)
+    ranked.insert(0, 'rank', range(1, len(ranked) + 1))
+    return ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a universe of symbols and rank them")
+    parser.add_argument("universe", help="Universe file (CSV with a scripcode column, or EXCHANGE:SCRIPCODE lines)")
+    parser.add_argument("--interval", default="1D")
+    parser.add_argument("--days-back", type=int, default=90)
+    parser.add_argument("--rank-by", default="change_pct", choices=SUMMARY_COLUMNS[4:])
+    parser.add_argument("--ascending", action="store_true")
+    parser.add_argument("--fetch-workers", type=int, default=MAX_FETCH_WORKERS)
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="Summary CSV path (default: scan_summary_<timestamp>.csv)")
+    parser.add_argument("--base-url", default=os.getenv("SHAREKHAN_BASE_URL",
+                                                        "https://api.sharekhan.com/skapi/services"))
+    args = parser.parse_args()
+
+    universe = load_universe(args.universe)
+    api = SharekhanDirectAPI(
+        api_key=os.getenv("SHAREKHAN_API_KEY", ""),
+        secret_key=os.getenv("SHAREKHAN_SECRET_KEY", ""),
+        user_id=os.getenv("SHAREKHAN_USER_ID", ""),
+        pool_maxsize=max(args.fetch_workers, 4),
+        base_url=args.base_url
+    )
+    if not api.login():
+        print("Failed to login. Please check your credentials.")
+        return
+
+    try:
+        print(f"Scanning {len(universe)} symbols ({args.interval}, last {args.days_back} days)...")
+        summary = rank_summary(
+            scan(api, universe, args.interval, args.days_back, args.fetch_workers, args.processes),
+            args.rank_by, args.ascending
+        )
+    finally:
+        api.logout()
+
+    output = args.output or f"scan_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    summary.to_csv(output, index=False)
+    print(summary.head(20).to_string(index=False))
+    print(f"\n✓ Ranked summary of {len(summary)} symbols saved to {output}")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -0,0 +1,306 @@
+# Streaming decode of Sharekhan historical responses into typed column buffers
+# The body is parsed record by record while it downloads and every field is
+# appended to an array.array, so the list-of-dicts payload is never built.
+
+import codecs
+import json
+import re
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+WHITESPACE = " \t\n\r"
+# Separators skipped between array elements
+ITEM_SEPARATORS = re.compile(r"[ \t\n\r,]*")
+# ISO strings with a UTC offset, which NumPy would silently convert to UTC
+TZ_SUFFIX = re.compile(r"(Z|[+-]\d\d:?\d\d)$")
+NAT = np.iinfo(np.int64).min  # NaT as int64 nanoseconds
+EPOCH = datetime(1970, 1, 1)
+
+_decoder = json.JSONDecoder()
+
+
+class HistoricalStreamParser:
+    """
+    Incremental parser for {"status": ..., "data": [{...}, ...]} bodies
+
+    feed() text as it arrives. Each complete element of the records array is
+    passed to on_record as soon as it is parsed; the other top-level fields
+    (status, message, ...) are collected in .fields.
+    """
+
+    def __init__(self, on_record, array_key="data"):
+        self.on_record = on_record
+        self.array_key = array_key
+        self.fields = {}
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+
+    def feed(self, text):
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        self._parse(final=False)
+
+    def close(self):
+        """
+        Parse whatever is left; raises ValueError if the body was not complete JSON
+        """
+        self._parse(final=True)
+        if self._state != "done":
+            raise ValueError("Truncated JSON response")
+
+    def _skip_whitespace(self):
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _decode(self, final):
+        """
+        Decode one JSON value at the current position, or return (None, False) if
+        it is not complete yet. A value that ends exactly at the end of the buffer
+        could be a number cut in half, so it waits for more input unless final.
+        """
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None, False
+        if end == len(self._buffer) and not final:
+            return None, False
+        self._pos = end
+        return value, True
+
+    def _expect(self, char):
+        if self._buffer[self._pos] != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos} of the buffered response")
+        self._pos += 1
+
+    def _parse(self, final):
+        while self._state != "done" and self._skip_whitespace():
+            char = self._buffer[self._pos]
+
+            if self._state == "start":
+                self._expect("{")
+                self._state = "key"
+
+            elif self._state == "key":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                if char == ",":
+                    self._pos += 1
+                    continue
+                start = self._pos
+                key, complete = self._decode(final)
+                if not complete:
+                    return
+                if not self._skip_whitespace():
+                    # Re-read the key once the colon has arrived
+                    self._pos = start
+                    return
+                self._expect(":")
+                self._key = key
+                self._state = "value"
+
+            elif self._state == "value":
+                if self._key == self.array_key and char == "[":
+                    self._pos += 1
+                    self._state = "items"
+                    continue
+                value, complete = self._decode(final)
+                if not complete:
+                    return
+                self.fields[self._key] = value
+                self._state = "key"
+
+            elif self._state == "items":
+                if not self._parse_items(final):
+                    return
+
+    def _parse_items(self, final):
+        """
+        Hot loop over the records array; returns False when more input is needed
+        """
+        buffer, pos, end = self._buffer, self._pos, len(self._buffer)
+        # scan_once is the C scanner behind raw_decode, without its per-call whitespace skip
+        scan, skip, on_record = _decoder.scan_once, ITEM_SEPARATORS.match, self.on_record
+        try:
+            while True:
+                pos = skip(buffer, pos).end()
+                if pos == end:
+                    return False
+                if buffer[pos] == "]":
+                    pos += 1
+                    self._state = "key"
+                    return True
+                try:
+                    record, record_end = scan(buffer, pos)
+                except StopIteration:
+                    if final:
+                        raise ValueError(f"Malformed record at offset {pos} of the buffered response")
+                    return False
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    return False
+                if record_end == end and not final:
+                    return False
+                on_record(record)
+                pos = record_end
+        finally:
+            self._pos = pos
+
+
+class ColumnBuffers:
+    """
+    Append-only typed columns built from API records
+
+    Records are collected in small batches and each batch is converted column by
+    column with C-level constructors. Numeric fields stay in array('q') while every
+    value is an int and move to array('d') at the first float, string or missing
+    value (like pandas' inference). Naive ISO timestamps are stored as int64
+    nanoseconds; anything else falls back to a list that pandas parses at the end.
+    """
+
+    def __init__(self, field_mapping, numeric_columns, datetime_column="datetime",
+                 batch_size=4096):
+        self.field_mapping = field_mapping
+        self.numeric_columns = set(numeric_columns)
+        self.datetime_column = datetime_column
+        self.batch_size = batch_size
+        self.columns = {}  # output name -> array or list
+        self.rows = 0  # rows already converted into the columns
+        self._sources = {}  # source field -> output name, first source per name wins
+        self._seen = set()
+        self._batch = []
+
+    def __len__(self):
+        return self.rows + len(self._batch)
+
+    def _add_field(self, field):
+        self._seen.add(field)
+        name = self.field_mapping.get(field, field)
+        if name in self.columns:
+            return
+        self._sources[field] = name
+        # Rows converted before the field first appeared are missing values
+        if name == self.datetime_column:
+            self.columns[name] = array('q', [NAT]) * self.rows
+        elif name in self.numeric_columns:
+            self.columns[name] = array('q') if not self.rows else array('d', [np.nan]) * self.rows
+        else:
+            self.columns[name] = [None] * self.rows
+
+    def append(self, record):
+        if not self._seen.issuperset(record):
+            for field in record:
+                if field not in self._seen:
+                    self._add_field(field)
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Convert the pending batch of records into the column buffers
+        """
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        for field, name in self._sources.items():
+            values = [record.get(field) for record in batch]
+            if name == self.datetime_column:
+                self._extend_timestamps(name, values)
+            elif name in self.numeric_columns:
+                self._extend_numbers(name, values)
+            else:
+                self.columns[name].extend(values)
+        self.rows += len(batch)
+
+    def _extend_numbers(self, name, values):
+        column = self.columns[name]
+        if column.typecode == 'q':
+            try:
+                column += array('q', values)
+                return
+            except (TypeError, OverflowError):
+                column = self.columns[name] = array('d', column)
+        try:
+            column += array('d', values)
+            return
+        except TypeError:
+            pass
+        # Numeric strings or missing values in this batch
+        try:
+            column.frombytes(np.array(values, dtype=np.float64).tobytes())
+        except (TypeError, ValueError):
+            column += array('d', map(_to_float, values))
+
+    def _extend_timestamps(self, name, values):
+        column = self.columns[name]
+        if type(column) is array:
+            if not any(type(value) is not str or TZ_SUFFIX.search(value)
+                       for value in values if value is not None):
+                try:
+                    column.frombytes(np.array(values, dtype='M8[ns]').view(np.int64).tobytes())
+                    return
+                except ValueError:
+                    pass
+            # Epoch numbers, other formats or time zones: let pandas parse the column
+            column = self.columns[name] = [
+                None if ns == NAT else EPOCH + timedelta(microseconds=ns // 1000) for ns in column
+            ]
+        column.extend(values)
+
+    def to_arrays(self):
+        """
+        Return (index, columns): the datetime column as datetime64 values (None if
+        absent) and every other column as a NumPy array sharing the buffer's memory
+        """
+        self.flush()
+        index = None
+        columns = {}
+        for name, column in self.columns.items():
+            if name == self.datetime_column:
+                if type(column) is array:
+                    index = np.frombuffer(column, dtype=np.int64).view('M8[ns]')
+                else:
+                    index = pd.to_datetime(column)
+            elif type(column) is array:
+                columns[name] = np.frombuffer(column, dtype=np.int64 if column.typecode == 'q'
+                                              else np.float64)
+            else:
+                columns[name] = np.array(column, dtype=object)
+        return index, columns
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def decode_historical_stream(byte_chunks, field_mapping, numeric_columns, encoding=None):
+    """
+    Parse a historical response body from an iterable of byte chunks
+    Returns (top-level fields, ColumnBuffers)
+    """
+    buffers = ColumnBuffers(field_mapping, numeric_columns)
+    parser = HistoricalStreamParser(buffers.append)
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")()
+    for chunk in byte_chunks:
+        if chunk:
+            parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.fields, buffers
@@ -0,0 +1,158 @@
+# Structured, non-blocking logging for the token app and the data client
+# Log calls only build a LogRecord and put it on an in-memory queue; a background
+# QueueListener thread does the redaction, JSON formatting and stream I/O.
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+
+
+ROOT_LOGGER = "sharekhan"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Fraction of high-volume success events that are kept (failures are always logged)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+# Field names whose values never reach the log output
+REDACTED_FIELDS = {
+    'secret', 'secret_id', 'secret_key', 'secretkey', 'token', 'access_token', 'accesstoken',
+    'auth_token', 'authtoken', 'request_token', 'requesttoken', 'refresh_token', 'refreshtoken',
+    'auth_code', 'code', 'encrypted_data', 'encrypted_payload', 'password', 'authorization',
+    'api_key', 'apikey'
+}
+REDACTED = "***"
+BEARER_PATTERN = re.compile(r"(Bearer\s+)\S+", re.IGNORECASE)
+
+_listener = None
+_queue_handler = None
+
+
+def redact(value):
+    """
+    Return a copy of value with secret fields masked (recurses into dicts and lists)
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in REDACTED_FIELDS and item is not None else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return BEARER_PATTERN.sub(r"\1" + REDACTED, value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, event and redacted fields
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) +
+                  f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": redact(record.getMessage()),
+        }
+        entry.update(redact(getattr(record, "fields", None) or {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Formatting (and redaction) happens on the listener thread, not the caller's
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Drop rather than block the request path when the writer falls behind
+            pass
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    logger.info("event_name", key=value, ...) with optional sample=<rate>
+    """
+
+    def __init__(self, logger):
+        super().__init__(logger, {})
+
+    def log(self, level, event, *args, sample=None, exc_info=None, stack_info=False, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample is not None and random.random() >= sample:
+            return
+        self.logger.log(level, event, *args, exc_info=exc_info, stack_info=stack_info,
+                        extra={"fields": fields})
+
+    def debug(self, event, *args, **kwargs):
+        self.log(logging.DEBUG, event, *args, **kwargs)
+
+    def info(self, event, *args, **kwargs):
+        self.log(logging.INFO, event, *args, **kwargs)
+
+    def warning(self, event, *args, **kwargs):
+        self.log(logging.WARNING, event, *args, **kwargs)
+
+    def error(self, event, *args, **kwargs):
+        self.log(logging.ERROR, event, *args, **kwargs)
+
+    def exception(self, event, *args, **kwargs):
+        kwargs.setdefault("exc_info", True)
+        self.log(logging.ERROR, event, *args, **kwargs)
+
+
+def get_logger(name):
+    """
+    Structured logger under the shared "sharekhan" namespace
+    """
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"))
+
+
+def setup_logging(level=LOG_LEVEL, stream=None, max_queue=10000):
+    """
+    Route the "sharekhan" loggers through a bounded queue to a background writer
+    Safe to call more than once; later calls keep the first configuration.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger(ROOT_LOGGER)
+    if _listener is not None:
+        return root
+    root.setLevel(level)
+
+    log_queue = queue.Queue(maxsize=max_queue)
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    _queue_handler = _NonBlockingQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return root
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the background writer
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
@@ -0,0 +1,211 @@
+# In-process access-token cache for the token generator app
+# Bounded LRU with expiry taken from the Sharekhan token response and
+# single-flight de-duplication of concurrent exchanges for the same key.
+# An optional shared TokenStore (token_store.py) backs it across worker processes.
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+from structured_logging import get_logger
+from token_store import new_lease_owner
+
+
+logger = get_logger("token_cache")
+
+
+# Keys in access_data["data"] that may carry the token lifetime (seconds)
+TTL_FIELDS = ('expires_in', 'expiresIn', 'expiry_in', 'validity')
+# Keys that may carry an absolute expiry (epoch seconds or milliseconds)
+EXPIRY_FIELDS = ('expires_at', 'expiresAt', 'expiry', 'expiryTime')
+
+
+def make_cache_key(app_id, secret_id):
+    """
+    Build a cache key from app_id and a digest of the secret, so a cached
+    token is only handed back to a caller that knows the same secret
+    """
+    digest = hashlib.sha256(secret_id.encode('utf-8')).hexdigest()
+    return f"{app_id}:{digest}"
+
+
+def token_ttl(access_data, default_ttl):
+    """
+    Work out how long (in seconds) a token response stays valid.
+    Falls back to default_ttl when the response carries no lifetime.
+    """
+    data = access_data.get("data") or {}
+    if not isinstance(data, dict):
+        return default_ttl
+
+    for field in TTL_FIELDS:
+        value = data.get(field)
+        try:
+            if value is not None:
+                return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            pass
+
+    for field in EXPIRY_FIELDS:
+        value = data.get(field)
+        try:
+            if value is not None:
+                expires_at = float(value)
+                if expires_at > 1e12:  # epoch milliseconds
+                    expires_at /= 1000.0
+                return max(expires_at - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+
+    return default_ttl
+
+
+class TokenCache:
+    def __init__(self, max_entries=1024, default_ttl=3600, expiry_margin=30, store=None,
+                 lease_timeout=20.0, lease_poll_interval=0.1):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        # Treat tokens as expired slightly early so callers never get one that dies in flight
+        self.expiry_margin = expiry_margin
+        # Shared second level (TokenStore) consulted on local misses, None for in-process only
+        self.store = store
+        # How long a worker waits for another worker's exchange of the same key
+        self.lease_timeout = lease_timeout
+        self.lease_poll_interval = lease_poll_interval
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None if missing/expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        """
+        Store value for ttl seconds, evicting least recently used entries when full
+        """
+        ttl = ttl - self.expiry_margin
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Return (value, cached). On a miss, await fetch() which must return
+        (value, ttl); concurrent callers for the same key share one fetch.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Someone else is already exchanging this key - wait for their result
+            self.hits += 1
+            value, _ = await asyncio.shield(inflight)
+            return value, True
+
+        self.misses += 1
+        # The fetch runs as its own task, so a caller that is cancelled (client gone)
+        # neither cancels it nor fails the callers waiting on the same key
+        task = asyncio.ensure_future(self._fill(key, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._fill_done(key, done))
+        return await asyncio.shield(task)
+
+    async def _fill(self, key, fetch):
+        value, ttl, cached = await self._load(key, fetch)
+        self.set(key, value, ttl)
+        return value, cached
+
+    def _fill_done(self, key, task):
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved when nobody was left waiting
+        if not task.cancelled():
+            task.exception()
+
+    async def _load(self, key, fetch):
+        """
+        Fill a local miss from the shared store, or fetch() and publish the result
+        to it. Returns (value, ttl, cached).
+        """
+        if self.store is None:
+            value, ttl = await fetch()
+            return value, ttl, False
+
+        stored = await self._from_store(key)
+        if stored is not None:
+            return (*stored, True)
+
+        # Only one worker exchanges a given key at a time; the others wait for its result
+        owner = new_lease_owner()
+        deadline = time.monotonic() + self.lease_timeout
+        leased = await self._call_store(self.store.acquire_lease, key, owner, self.lease_timeout,
+                                        default=True)
+        while not leased and time.monotonic() < deadline:
+            await asyncio.sleep(self.lease_poll_interval)
+            stored = await self._from_store(key)
+            if stored is not None:
+                return (*stored, True)
+            leased = await self._call_store(self.store.acquire_lease, key, owner,
+                                            self.lease_timeout, default=True)
+
+        try:
+            value, ttl = await fetch()
+            await self._call_store(self.store.set, key, value, ttl)
+        finally:
+            if leased:
+                await self._call_store(self.store.release_lease, key, owner)
+        return value, ttl, False
+
+    async def _from_store(self, key):
+        stored = await self._call_store(self.store.get, key)
+        if stored is None or stored[1] <= self.expiry_margin:
+            return None
+        self.store_hits += 1
+        return stored
+
+    async def _call_store(self, method, *args, default=None):
+        # Store I/O runs off the event loop; a failing store only costs a direct exchange
+        try:
+            return await asyncio.to_thread(method, *args)
+        except Exception as e:
+            logger.warning("token_store_error", operation=method.__name__, error=str(e))
+            return default
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "store_hits": self.store_hits,
+            "evictions": self.evictions,
+        }
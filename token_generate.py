@@ -1,22 +1,212 @@
-from fastapi import FastAPI, Form, Request, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from fastapi import APIRouter, FastAPI, Form, Request, HTTPException, Path, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-import requests
+import asyncio
+import httpx
 import os
 import base64
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+import time
+from history_cache import HistoryBusy, HistoryCache, HistoryUnavailable, SharekhanHistorySource, etag_matches, parse_series
+from metrics import REGISTRY, UPSTREAM_LATENCY, UPSTREAM_IN_FLIGHT, SamplingProfiler
+from structured_logging import LOG_SAMPLE_RATE, get_logger, setup_logging
+from token_cache import TokenCache, make_cache_key, token_ttl
+from token_store import create_token_store
+from pydantic import BaseModel
+from typing import List
 from base64 import urlsafe_b64encode, urlsafe_b64decode
 
-app = FastAPI()
+try:
+    # Optional: orjson serializes the JSON API responses several times faster
+    import orjson  # noqa: F401 - ORJSONResponse needs it at response time, not import time
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
 
-# Setup templates and static directories
-os.makedirs("static", exist_ok=True)
-os.makedirs("templates", exist_ok=True)
+# Jinja2 and cryptography are imported on first use, so importing this module
+# (cron jobs, workers booting) only pays for FastAPI and httpx
+logger = get_logger("token_generate")
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+
+# ----------------------------- Upstream HTTP Client -----------------------------
+
+# Point SHAREKHAN_BASE_URL at a stand-in server (see benchmarks/mock_sharekhan.py) for offline runs
+SHAREKHAN_BASE_URL = os.getenv("SHAREKHAN_BASE_URL", "https://api.sharekhan.com/skapi/services")
+ACCESS_TOKEN_URL = f"{SHAREKHAN_BASE_URL}/access/token"
+
+# Connection pool / timeout settings for the token exchange (overridable via env)
+EXCHANGE_CONCURRENCY = int(os.getenv("TOKEN_EXCHANGE_CONCURRENCY", "100"))
+EXCHANGE_CONNECT_TIMEOUT = float(os.getenv("TOKEN_EXCHANGE_CONNECT_TIMEOUT", "5"))
+EXCHANGE_READ_TIMEOUT = float(os.getenv("TOKEN_EXCHANGE_READ_TIMEOUT", "15"))
+
+# Access-token cache settings (overridable via env)
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "1024"))
+TOKEN_CACHE_DEFAULT_TTL = float(os.getenv("TOKEN_CACHE_DEFAULT_TTL", "3600"))
+
+# Token store shared by all workers on the host ("sqlite" or "none")
+TOKEN_STORE = os.getenv("TOKEN_STORE", "sqlite")
+TOKEN_STORE_PATH = os.getenv("TOKEN_STORE_PATH", "token_store.db")
+
+# Per-request sampling profiler: send "X-Profile: 1" when this is enabled
+REQUEST_PROFILING = os.getenv("ENABLE_REQUEST_PROFILING", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Historical bars served from a warm in-memory cache (credentials for the data API)
+SHAREKHAN_API_KEY = os.getenv("SHAREKHAN_API_KEY", "")
+SHAREKHAN_SECRET_KEY = os.getenv("SHAREKHAN_SECRET_KEY", "")
+SHAREKHAN_USER_ID = os.getenv("SHAREKHAN_USER_ID", "")
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "300"))
+HISTORY_REFRESH_INTERVAL = float(os.getenv("HISTORY_REFRESH_INTERVAL", "60"))
+HISTORY_CACHE_MAX_ENTRIES = int(os.getenv("HISTORY_CACHE_MAX_ENTRIES", "256"))
+HISTORY_POPULAR_COUNT = int(os.getenv("HISTORY_POPULAR_COUNT", "20"))
+# Threads fetching uncached series, and how many series may wait for one before /history answers 503
+HISTORY_FETCH_WORKERS = int(os.getenv("HISTORY_FETCH_WORKERS", "2"))
+HISTORY_MAX_PENDING_FETCHES = int(os.getenv("HISTORY_MAX_PENDING_FETCHES", "16"))
+# Seconds a series that failed upstream is answered with the cached error
+HISTORY_FAILURE_TTL = float(os.getenv("HISTORY_FAILURE_TTL", "30"))
+HISTORY_DAYS_BACK = int(os.getenv("HISTORY_DAYS_BACK", "30"))
+# The only days_back values clients may ask for: each one is a separate cached series,
+# so an open range would let any caller force uncached upstream reads
+HISTORY_DAYS_BACK_CHOICES = sorted({HISTORY_DAYS_BACK, *(
+    int(days) for days in os.getenv("HISTORY_DAYS_BACK_CHOICES", "1,7,30,90,365").split(",")
+    if days.strip()
+)})
+# Comma-separated EXCHANGE:SCRIPCODE:INTERVAL[:DAYS_BACK] series kept warm from startup
+HISTORY_WARM_SERIES = os.getenv("HISTORY_WARM_SERIES", "")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Process setup on startup: logging, static/template directories, one pooled
+    keep-alive client for the whole process and the history refresh task (all
+    closed on shutdown)
+    """
+    setup_logging()
+    os.makedirs("static", exist_ok=True)
+    os.makedirs("templates", exist_ok=True)
+
+    app.state.http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(EXCHANGE_READ_TIMEOUT, connect=EXCHANGE_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=EXCHANGE_CONCURRENCY,
+            max_keepalive_connections=EXCHANGE_CONCURRENCY,
+        ),
+        headers={"Content-Type": "application/json"},
+    )
+    app.state.exchange_semaphore = asyncio.Semaphore(EXCHANGE_CONCURRENCY)
+    app.state.token_store = create_token_store(TOKEN_STORE, TOKEN_STORE_PATH)
+    app.state.token_cache = TokenCache(
+        max_entries=TOKEN_CACHE_MAX_ENTRIES,
+        default_ttl=TOKEN_CACHE_DEFAULT_TTL,
+        store=app.state.token_store,
+    )
+    app.state.history_source = SharekhanHistorySource(
+        SHAREKHAN_API_KEY, SHAREKHAN_SECRET_KEY, SHAREKHAN_USER_ID, SHAREKHAN_BASE_URL
+    )
+    app.state.history_cache = HistoryCache(
+        app.state.history_source,
+        ttl=HISTORY_CACHE_TTL,
+        refresh_interval=HISTORY_REFRESH_INTERVAL,
+        max_entries=HISTORY_CACHE_MAX_ENTRIES,
+        popular_count=HISTORY_POPULAR_COUNT,
+        max_fetch_workers=HISTORY_FETCH_WORKERS,
+        max_pending_fetches=HISTORY_MAX_PENDING_FETCHES,
+        failure_ttl=HISTORY_FAILURE_TTL,
+        warm_series=[parse_series(spec, HISTORY_DAYS_BACK)
+                     for spec in HISTORY_WARM_SERIES.split(",") if spec.strip()],
+    )
+    history_refresh = asyncio.create_task(app.state.history_cache.run())
+    _serving_apps.append(app)
+    try:
+        yield
+    finally:
+        _serving_apps.remove(app)
+        history_refresh.cancel()
+        try:
+            await history_refresh
+        except asyncio.CancelledError:
+            pass
+        app.state.history_cache.close()
+        app.state.history_source.close()
+        await app.state.http_client.aclose()
+        if app.state.token_store is not None:
+            app.state.token_store.close()
+
+
+router = APIRouter()
+
+
+# ----------------------------- Metrics -----------------------------
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latency of requests to this app by route")
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "Requests to this app currently being handled")
+TOKEN_CACHE_EVENTS = REGISTRY.gauge(
+    "token_cache_stats", "Access-token cache counters (hits, misses, evictions, entries)")
+HISTORY_CACHE_EVENTS = REGISTRY.gauge(
+    "history_cache_stats", "Historical-bars cache counters (hits, misses, refreshes, entries)")
+
+
+# Apps whose lifespan is running; the collector below reads their caches. Registered
+# once per process, so creating more apps (uvicorn --factory, tests) adds no collectors
+_serving_apps = []
+
+
+def _collect_cache_stats():
+    for app in _serving_apps:
+        for gauge, cache in ((TOKEN_CACHE_EVENTS, app.state.token_cache),
+                             (HISTORY_CACHE_EVENTS, app.state.history_cache)):
+            for name, value in cache.stats().items():
+                gauge.set(value, stat=name)
+
+
+REGISTRY.add_collector(_collect_cache_stats)
+
+
+async def record_request_metrics(request: Request, call_next):
+    profiler = None
+    if REQUEST_PROFILING and request.headers.get("x-profile") == "1":
+        # Sync routes run in the threadpool, so every thread is sampled, not just the
+        # event loop's; concurrent requests show up in the profile too
+        profiler = SamplingProfiler(all_threads=True).start()
+
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+    if profiler is not None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_file = os.path.join(PROFILE_DIR, f"profile_{time.time_ns()}.collapsed")
+        with open(profile_file, "w") as f:
+            f.write(profiler.collapsed())
+        response.headers["X-Profile-File"] = profile_file
+    return response
+
+
+@lru_cache(maxsize=None)
+def get_templates():
+    """
+    Jinja2 templates, loaded on the first HTML response (JSON clients never import Jinja)
+    """
+    from fastapi.templating import Jinja2Templates
+    return Jinja2Templates(directory="templates")
 
 
 # ----------------------------- Encryption Functions -----------------------------
@@ -28,12 +218,16 @@ key = key_string.encode('utf-8')[:32].ljust(32, b'\0')
 iv = base64.b64decode("AAAAAAAAAAAAAAAAAAAAAA==")
 
 def encryptAPIString(plaintext):  
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
     raw = plaintext.encode('utf-8')   
     encryptor = Cipher(algorithms.AES(key), modes.GCM(iv, None, 16), default_backend()).encryptor()
     ciphertext = encryptor.update(raw) + encryptor.finalize()  
     return base64UrlEncode(ciphertext + encryptor.tag)
  
 def decryptAPIString(ciphertext):   
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
     enc_data = base64UrlDecode(ciphertext)
     enc = enc_data[:-16]  # ciphertext without tag
     tag = enc_data[-16:]  # last 16 bytes are the tag
@@ -48,14 +242,60 @@ def base64UrlDecode(base64Url):
     return urlsafe_b64decode(base64Url + padding)
 
 
+# Reusable AES-GCM context - the key schedule is set up once and shared by the batch helpers
+@lru_cache(maxsize=None)
+def _aesgcm():
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM(key)
+
+def _as_bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+def encrypt_many(plaintexts):
+    """
+    Encrypt a list of strings with the Sharekhan scheme.
+    Returns base64url (unpadded) bytes, same format as encryptAPIString.
+    """
+    encrypt = _aesgcm().encrypt
+    return [
+        urlsafe_b64encode(encrypt(iv, _as_bytes(plaintext), None)).rstrip(b'=')
+        for plaintext in plaintexts
+    ]
+
+def decrypt_many(ciphertexts):
+    """
+    Decrypt a list of base64url strings produced by encryptAPIString/encrypt_many.
+    Returns the plaintext bytes, same as decryptAPIString.
+    """
+    decrypt = _aesgcm().decrypt
+    results = []
+    for ciphertext in ciphertexts:
+        ciphertext = _as_bytes(ciphertext)
+        # Only pad when needed (already aligned input is decoded without a copy)
+        missing = -len(ciphertext) % 4
+        if missing:
+            ciphertext += b'=' * missing
+        # AESGCM expects ciphertext followed by the 16 byte tag, which is our wire format
+        results.append(decrypt(iv, urlsafe_b64decode(ciphertext), None))
+    return results
+
+
 # ----------------------------- Routes -----------------------------
 
-@app.get("/", response_class=HTMLResponse)
+def wants_json(request: Request):
+    """
+    True when the client prefers JSON over HTML (scripts), so template rendering is skipped
+    """
+    accept = request.headers.get("accept", "")
+    return "application/json" in accept and "text/html" not in accept
+
+
+@router.get("/", response_class=HTMLResponse)
 def home(request: Request):
-    return templates.TemplateResponse("form.html", {"request": request})
+    return get_templates().TemplateResponse("form.html", {"request": request})
 
 
-@app.get("/login")
+@router.get("/login")
 def login(app_id: str):
     version_id = "1005"
     state = "12345"
@@ -68,35 +308,109 @@ def login(app_id: str):
         f"&version_id={version_id}"
         f"&callback_url={callback_url}"
     )
-    print(f"Redirecting to: {login_url}")
+    logger.info("login_redirect", version_id=version_id, state=state, sample=LOG_SAMPLE_RATE)
     return RedirectResponse(login_url)
 
 
-@app.get("/callback", response_class=HTMLResponse)
+@router.get("/callback", response_class=HTMLResponse)
 def callback(request: Request, request_token: str = None, code: str = None, state: str = None):
-    print(f"Callback received - request_token: {request_token}, code: {code}, state: {state}")
-    print(f"Full query params: {dict(request.query_params)}")
+    logger.info("callback_received", request_token=request_token, code=code, state=state,
+                sample=LOG_SAMPLE_RATE)
+    logger.debug("callback_query_params", params=dict(request.query_params))
     
     # Sharekhan uses 'request_token' instead of 'code'
     auth_code = request_token or code
     
     if not auth_code:
-        return templates.TemplateResponse("result.html", {
+        error = "No authorization code received from Sharekhan."
+        if wants_json(request):
+            return FastJSONResponse({"success": False, "error": error}, status_code=400)
+        return get_templates().TemplateResponse("result.html", {
             "request": request,
             "success": False,
-            "error": "No authorization code received from Sharekhan."
+            "error": error
         })
 
+    if wants_json(request):
+        return FastJSONResponse({"success": True, "auth_code": auth_code, "state": state})
+
     # Store auth_code and show form to collect secret_id
-    return templates.TemplateResponse("form.html", {
+    return get_templates().TemplateResponse("form.html", {
         "request": request,
         "auth_code": auth_code,
         "message": "Authorization successful! Now enter your credentials to complete token generation."
     })
 
 
-@app.post("/generate_token", response_class=HTMLResponse)
-def generate_token(
+async def _post_access_token(client, payload, exchange):
+    """
+    POST to the access/token endpoint, recording latency by exchange type and outcome
+    """
+    with UPSTREAM_IN_FLIGHT.track(endpoint="access/token"), \
+            UPSTREAM_LATENCY.time(endpoint="access/token", exchange=exchange, outcome="error") as labels:
+        response = await client.post(ACCESS_TOKEN_URL, json=payload)
+        labels["outcome"] = str(response.status_code)
+    return response
+
+
+async def exchange_access_token(client, semaphore, app_id, secret_id, auth_code):
+    """
+    Exchange the request token for an access token using the shared pooled client.
+    Tries the encrypted payload first and falls back to the plain payload.
+    Returns (access_response, encrypted_data).
+    """
+    # Direct approach with encryption - This is likely required for Sharekhan API
+
+    # Step 1: Encrypt the secret_key (or other sensitive data)
+    # Format appears to be: request_token|secret_key based on the pattern
+    message_to_encrypt = f"{auth_code}|{secret_id}"
+    encrypted_data = encryptAPIString(message_to_encrypt)
+
+    # Step 2: Make API call with encrypted data
+    # Try different payload structures - the API might expect encrypted data
+    access_payload = {
+        "api_key": app_id,
+        "encrypted_data": encrypted_data.decode('utf-8'),  # Convert bytes to string
+        "state": "12345"
+    }
+
+    # Alternative payload structure if the above doesn't work:
+    # access_payload = {
+    #     "api_key": app_id,
+    #     "request_token": encrypted_data.decode('utf-8'),
+    #     "state": "12345"
+    # }
+
+    logger.debug("access_token_payload", payload=access_payload)
+
+    # Bound the number of in-flight upstream exchanges per process
+    async with semaphore:
+        access_response = await _post_access_token(client, access_payload, "encrypted")
+        logger.info("access_token_response", exchange="encrypted",
+                    status=access_response.status_code, sample=LOG_SAMPLE_RATE)
+
+        # If the API call fails, try without encryption as fallback
+        if access_response.status_code != 200:
+            logger.warning("encrypted_exchange_failed", status=access_response.status_code)
+            access_payload_fallback = {
+                "api_key": app_id,
+                "request_token": auth_code,
+                "secret_key": secret_id,
+                "state": "12345"
+            }
+            access_response = await _post_access_token(client, access_payload_fallback, "fallback")
+            if access_response.status_code == 200:
+                logger.info("access_token_response", exchange="fallback",
+                            status=access_response.status_code, sample=LOG_SAMPLE_RATE)
+            else:
+                logger.warning("access_token_response", exchange="fallback",
+                               status=access_response.status_code, **response_log_fields(access_response))
+
+    return access_response, encrypted_data
+
+
+@router.post("/generate_token", response_class=HTMLResponse)
+async def generate_token(
     request: Request,
     app_id: str = Form(...),
     secret_id: str = Form(...),
@@ -116,89 +430,216 @@ def generate_token(
         return RedirectResponse(url=login_url, status_code=302)
 
     try:
-        # Direct approach with encryption - This is likely required for Sharekhan API
-        
-        # Step 1: Encrypt the secret_key (or other sensitive data)
-        # Format appears to be: request_token|secret_key based on the pattern
-        message_to_encrypt = f"{auth_code}|{secret_id}"
-        encrypted_data = encryptAPIString(message_to_encrypt)
-        
-        print(f"Original message: {message_to_encrypt}")
-        print(f"Encrypted data: {encrypted_data}")
-        
-        # Step 2: Make API call with encrypted data
-        access_token_url = "https://api.sharekhan.com/skapi/services/access/token"
-        
-        # Try different payload structures - the API might expect encrypted data
-        access_payload = {
-            "api_key": app_id,
-            "encrypted_data": encrypted_data.decode('utf-8'),  # Convert bytes to string
-            "state": "12345"
-        }
-        
-        # Alternative payload structure if the above doesn't work:
-        # access_payload = {
-        #     "api_key": app_id,
-        #     "request_token": encrypted_data.decode('utf-8'),
-        #     "state": "12345"
-        # }
-        
-        headers = {"Content-Type": "application/json"}
-        print(f"Access token payload: {access_payload}")
-        
-        access_response = requests.post(access_token_url, json=access_payload, headers=headers)
-        print(f"Access token response: {access_response.status_code}, {access_response.text}")
-        
-        # If the API call fails, try without encryption as fallback
-        if access_response.status_code != 200:
-            print("Encrypted call failed, trying without encryption...")
-            access_payload_fallback = {
-                "api_key": app_id,
-                "request_token": auth_code,
-                "secret_key": secret_id,
-                "state": "12345"
-            }
-            access_response = requests.post(access_token_url, json=access_payload_fallback, headers=headers)
-            print(f"Fallback response: {access_response.status_code}, {access_response.text}")
-        
-        access_response.raise_for_status()
-        access_data = access_response.json()
-        
-        # Success response
-        return templates.TemplateResponse("result.html", {
-            "request": request,
-            "success": True,
-            "token_data": {
-                "status": access_data.get("status"),
-                "message": access_data.get("message"),
-                "timestamp": access_data.get("timestamp"),
-                "data": access_data.get("data", {}),
-                "encryption_used": True,
-                "encrypted_payload": encrypted_data.decode('utf-8'),
-                "note": "Access token generated with encryption"
-            }
-        })
-
-    except requests.exceptions.RequestException as req_err:
-        error_msg = f"Request error: {str(req_err)}"
-        if hasattr(req_err, 'response') and req_err.response is not None:
-            try:
-                error_detail = req_err.response.json()
-                error_msg = f"API error: {error_detail}"
-            except:
-                error_msg = f"HTTP {req_err.response.status_code}: {req_err.response.text}"
-        
-        return templates.TemplateResponse("result.html", {
+        token_data = await obtain_access_token(request.app, app_id, secret_id, auth_code)
+    except Exception as e:
+        if wants_json(request):
+            return token_error_response(e)
+        return get_templates().TemplateResponse("result.html", {
             "request": request,
             "success": False,
-            "error": error_msg
+            "error": token_error_message(e)
         })
+
+    if wants_json(request):
+        return FastJSONResponse(token_data)
+
+    # Success response
+    return get_templates().TemplateResponse("result.html", {
+        "request": request,
+        "success": True,
+        "token_data": token_data
+    })
+
+
+async def obtain_access_token(app, app_id, secret_id, auth_code):
+    """
+    Return the token data for (app_id, secret_id), from the cache or a fresh exchange.
+    Raises httpx.HTTPError when the exchange fails.
+    """
+    async def fetch_token():
+        access_response, encrypted_data = await exchange_access_token(
+            app.state.http_client,
+            app.state.exchange_semaphore,
+            app_id, secret_id, auth_code
+        )
+
+        access_response.raise_for_status()
+        access_data = access_response.json()
+
+        token_data = {
+            "status": access_data.get("status"),
+            "message": access_data.get("message"),
+            "timestamp": access_data.get("timestamp"),
+            "data": access_data.get("data", {}),
+            "encryption_used": True,
+            "encrypted_payload": encrypted_data.decode('utf-8'),
+            "note": "Access token generated with encryption"
+        }
+        # Only cache responses that actually carry token data
+        ttl = token_ttl(access_data, TOKEN_CACHE_DEFAULT_TTL) if access_data.get("data") else 0
+        return token_data, ttl
+
+    token_data, cached = await app.state.token_cache.get_or_fetch(
+        make_cache_key(app_id, secret_id), fetch_token
+    )
+    if cached:
+        token_data = {**token_data, "note": "Access token served from cache"}
+    return token_data
+
+
+def response_log_fields(response):
+    """
+    Log fields describing an upstream response body without leaking it: parsed JSON
+    (secret fields are masked by the log formatter), or only the length of raw text
+    """
+    try:
+        return {"body": response.json()}
+    except ValueError:
+        return {"body_length": len(response.content)}
+
+
+def token_error_message(error):
+    """
+    User-facing message for a failed token exchange (logs the failure)
+    """
+    if isinstance(error, httpx.HTTPError):
+        if not isinstance(error, httpx.HTTPStatusError):
+            error_msg = f"Request error: {str(error)}"
+            logger.warning("token_exchange_failed", error=error_msg)
+            return error_msg
+
+        response = error.response
+        try:
+            error_msg = f"API error: {response.json()}"
+        except ValueError:
+            error_msg = f"HTTP {response.status_code}: {response.text}"
+        logger.warning("token_exchange_failed", status=response.status_code,
+                       **response_log_fields(response))
+        return error_msg
+
+    logger.error("token_exchange_error", exc_info=error)
+    return f"Unexpected error: {str(error)}"
+
+
+def token_error_response(error):
+    # Upstream failures are a bad gateway, anything else is our own error
+    status_code = 502 if isinstance(error, httpx.HTTPError) else 500
+    return FastJSONResponse({"success": False, "error": token_error_message(error)},
+                            status_code=status_code)
+
+
+class TokenRequest(BaseModel):
+    app_id: str
+    secret_id: str
+    auth_code: str
+
+
+@router.post("/api/token")
+async def api_token(request: Request, payload: TokenRequest):
+    """
+    Machine-facing token exchange: JSON in, token data out, no template rendering
+    """
+    try:
+        token_data = await obtain_access_token(request.app, payload.app_id, payload.secret_id,
+                                               payload.auth_code)
     except Exception as e:
-        return templates.TemplateResponse("result.html", {
-            "request": request,
+        return token_error_response(e)
+    return token_data
+
+
+class BatchCryptoRequest(BaseModel):
+    items: List[str]
+
+
+@router.post("/api/encrypt")
+def encrypt_batch(payload: BatchCryptoRequest):
+    return {"items": [item.decode('utf-8') for item in encrypt_many(payload.items)]}
+
+
+@router.post("/api/decrypt")
+def decrypt_batch(payload: BatchCryptoRequest):
+    try:
+        plaintexts = decrypt_many(payload.items)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Decryption failed: {e.__class__.__name__}")
+    return {"items": [item.decode('utf-8', errors='replace') for item in plaintexts]}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/token_cache/stats")
+def token_cache_stats(request: Request):
+    return request.app.state.token_cache.stats()
+
+
+SERIES_PART = r"^[A-Za-z0-9_.-]+$"
+
+
+@router.get("/history/{exchange}/{scripcode}/{interval}")
+async def history(
+    request: Request,
+    exchange: str = Path(pattern=SERIES_PART),
+    scripcode: str = Path(pattern=SERIES_PART),
+    interval: str = Path(pattern=SERIES_PART),
+    days_back: int = Query(HISTORY_DAYS_BACK)
+):
+    """
+    Processed OHLCV bars from the warm cache. Send If-None-Match with the last ETag
+    to get a 304 when the series has not changed.
+    """
+    if days_back not in HISTORY_DAYS_BACK_CHOICES:
+        return FastJSONResponse({
             "success": False,
-            "error": f"Unexpected error: {str(e)}"
-        })
+            "error": f"days_back must be one of {HISTORY_DAYS_BACK_CHOICES}"
+        }, status_code=422)
+
+    history_cache = request.app.state.history_cache
+    try:
+        entry = await history_cache.get((exchange.upper(), scripcode, interval, days_back))
+    except Exception as e:
+        # Upstream failures (or no data) with nothing cached to fall back on
+        logger.warning("history_unavailable", exchange=exchange, scripcode=scripcode,
+                       interval=interval, error=str(e))
+        if isinstance(e, HistoryBusy):
+            return FastJSONResponse({"success": False, "error": str(e)}, status_code=503,
+                                    headers={"Retry-After": "1"})
+        status_code = 502 if isinstance(e, HistoryUnavailable) else 500
+        return FastJSONResponse({"success": False, "error": str(e)}, status_code=status_code)
+
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"max-age={max(int(history_cache.ttl - entry.age()), 0)}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+@router.get("/history_cache/stats")
+def history_cache_stats(request: Request):
+    return request.app.state.history_cache.stats()
+
+
+# ----------------------------- App Factory -----------------------------
+
+def create_app():
+    """
+    Build the FastAPI app. Nothing touches the filesystem or network until startup
+    (see lifespan), so creating it is cheap.
+    """
+    app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+    app.middleware("http")(record_request_metrics)
+    app.include_router(router)
+    # The directory is created in lifespan, so don't check for it here
+    app.mount("/static", StaticFiles(directory="static", check_dir=False), name="static")
+    return app
+
+
+# For "uvicorn token_generate:app" (or "uvicorn --factory token_generate:create_app")
+app = create_app()
 
 
 # ----------------------------- Run -----------------------------
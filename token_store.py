@@ -0,0 +1,166 @@
+# Shared access-token store for running the token app under several workers
+# TokenCache keeps a per-process copy; this store is the second level that every
+# worker reads and writes, so a token minted in one worker is reused by the others.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class TokenStore:
+    """
+    Interface for shared token stores. Values are JSON-serializable dicts and
+    expiry is enforced by the store, so get() never returns an expired token.
+    """
+
+    def get(self, key):
+        """
+        Return (value, seconds_left) for key, or None if missing/expired
+        """
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def acquire_lease(self, key, owner, ttl):
+        """
+        Try to become the one worker exchanging key for the next ttl seconds
+        """
+        return True
+
+    def release_lease(self, key, owner):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Token store in a local SQLite file shared by all workers on the host
+
+    SQLite's file locking serializes writers across processes and every write is a
+    single transaction, so readers see either the old or the new token, never a
+    partial one. WAL mode lets reads proceed while another worker writes.
+    """
+
+    def __init__(self, path="token_store.db", busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path):
+            # The file holds live access tokens - keep it private to the owner
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tokens_expires_at ON tokens (expires_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        # One connection per thread; check_same_thread is off only so close() can run elsewhere
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self, *statements):
+        """
+        Run statements in one IMMEDIATE transaction (takes the write lock up front)
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = None
+            for sql, params in statements:
+                cursor = conn.execute(sql, params)
+            conn.execute("COMMIT")
+            return cursor
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM tokens WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        return json.loads(value), expires_at - now
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        now = time.time()
+        self._write(
+            ("INSERT OR REPLACE INTO tokens (key, value, expires_at) VALUES (?, ?, ?)",
+             (key, json.dumps(value), now + ttl)),
+            # Expired rows are dropped by whichever worker writes next
+            ("DELETE FROM tokens WHERE expires_at <= ?", (now,)),
+        )
+
+    def delete(self, key):
+        self._write(("DELETE FROM tokens WHERE key = ?", (key,)))
+
+    def acquire_lease(self, key, owner, ttl):
+        now = time.time()
+        cursor = self._write(
+            ("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now)),
+            ("INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+             (key, owner, now + ttl)),
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, key, owner):
+        self._write(("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner)))
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
+def new_lease_owner():
+    """
+    Unique owner id for leases taken by this process
+    """
+    return f"{os.getpid()}:{uuid.uuid4().hex}"
+
+
+def create_token_store(backend, path):
+    """
+    Build the configured store: "sqlite" (default) or "none" for per-process caching only
+    """
+    backend = (backend or "none").lower()
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        return SQLiteTokenStore(path)
+    raise ValueError(f"Unknown token store backend: {backend}")